@@ -1,5 +1,7 @@
 from app.db.session import SessionLocal
 
+__all__ = ["SessionLocal", "get_db"]
+
 
 def get_db():
     """Database session dependency"""
@@ -16,8 +16,9 @@ def _collect_user_data(db: Session, owner_id: str) -> dict:
     try:
         from app.models.billing import UserAccount, CreditTransaction  # type: ignore
         acct = db.query(UserAccount).filter(UserAccount.owner_id == owner_id).first()
+        # Cap like messages below: the ledger grows without bound, so export the newest rows only
         txs = db.query(CreditTransaction).filter(CreditTransaction.owner_id == owner_id).order_by(
-            CreditTransaction.created_at.desc()).all()
+            CreditTransaction.created_at.desc()).limit(10000).yield_per(500)
         data["account"] = {
             "credit_balance": getattr(acct, "credit_balance", None) if acct else None,
             "plan": getattr(acct, "plan", None) if acct else None,
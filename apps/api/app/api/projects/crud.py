@@ -8,9 +8,10 @@ from datetime import datetime
 from typing import List, Optional
 
 from app.api.auth import get_current_user, CurrentUser
-from app.api.deps import get_db
+from app.api.deps import get_db, SessionLocal
 from app.core.config import settings
 from app.core.websocket.manager import manager as websocket_manager
+from app.db.session import dialect_insert
 from app.models.messages import Message
 from app.models.project_services import ProjectServiceConnection
 from app.models.projects import Project as ProjectModel
@@ -19,12 +20,20 @@ from app.services.local_runtime import get_npm_executable
 from app.services.project.initializer import initialize_project
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel, Field
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, update
 from sqlalchemy.orm import Session
 
 # Project ID validation regex
 PROJECT_ID_REGEX = re.compile(r"^[a-z0-9-]{3,}$")
 
+# Service providers every project reports, even when not connected
+_DEFAULT_SERVICE_PROVIDERS = ("github", "supabase", "vercel")
+
+
+def _default_services() -> dict:
+    """Fresh "disconnected" entries per response, so no caller can mutate a shared one."""
+    return {provider: {"connected": False, "status": "disconnected"} for provider in _DEFAULT_SERVICE_PROVIDERS}
+
 
 # Pydantic models
 class ProjectCreate(BaseModel):
@@ -84,67 +93,49 @@ async def initialize_project_background(project_id: str, project_name: str, body
             }
         })
 
-        # Initialize the project using the existing initializer
-        from app.services.project.initializer import initialize_project
-        from app.api.deps import get_db
-
         # Create new database session for background task
-        db_session = next(get_db())
-
-        try:
+        with SessionLocal() as db_session:
             # Start both tasks concurrently for faster initialization
             tasks = []
 
             # Task 1: Initialize project files
             async def init_project_task():
-                project_path = await initialize_project(project_id, project_name)
-
-                # Update project with repo path using fresh session
-                project = db_session.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-                if project:
-                    project.repo_path = project_path
-                    db_session.commit()
-
-                return project_path
+                return await initialize_project(project_id, project_name)
 
             tasks.append(init_project_task())
 
             # Skip metadata generation - will use initial prompt directly
 
             # Wait for both tasks to complete concurrently
-            await asyncio.gather(*tasks)
+            project_path, *_ = await asyncio.gather(*tasks)
 
-            # Now set status to active and send final completion message
-            project = db_session.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-            if project:
-                project.status = "active"
-                db_session.commit()
-
-            # Send final completion status
-            await websocket_manager.broadcast_to_project(project_id, {
-                "type": "project_status",
-                "data": {
-                    "status": "active",
-                    "message": "Project ready!"
-                }
-            })
+            # Store repo path and mark active in a single UPDATE/commit
+            db_session.execute(
+                update(ProjectModel)
+                .where(ProjectModel.id == project_id)
+                .values(repo_path=project_path, status="active")
+            )
+            db_session.commit()
 
-            print(f"✅ Project {project_id} initialized successfully")
+        # Send final completion status
+        await websocket_manager.broadcast_to_project(project_id, {
+            "type": "project_status",
+            "data": {
+                "status": "active",
+                "message": "Project ready!"
+            }
+        })
 
-        finally:
-            db_session.close()
+        print(f"✅ Project {project_id} initialized successfully")
 
     except Exception as e:
         # Create separate session for error handling
-        error_db = next(get_db())
-        try:
+        with SessionLocal() as error_db:
             # Update project status to failed
             project = error_db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
             if project:
                 project.status = "failed"
                 error_db.commit()
-        finally:
-            error_db.close()
 
         # Send error status
         await websocket_manager.broadcast_to_project(project_id, {
@@ -230,8 +221,11 @@ async def install_project_dependencies(
     """Install project dependencies in background (only owner)"""
 
     # Check if project exists and is owned by the current user
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-    if not project or project.owner_id != current_user["id"]:
+    project = db.query(ProjectModel).filter(
+        ProjectModel.id == project_id,
+        ProjectModel.owner_id == current_user["id"]
+    ).first()
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     if not project.repo_path:
@@ -256,12 +250,15 @@ async def list_projects(
 ) -> List[Project]:
     """List all projects for the current user with their status and last activity"""
 
-    # Get projects with their last message time using subquery
+    # Get projects with their last message time using subquery, scoped to this
+    # user's projects so only their messages are aggregated
     last_message_subquery = (
         db.query(
             Message.project_id,
             func.max(Message.created_at).label('last_message_at')
         )
+        .join(ProjectModel, ProjectModel.id == Message.project_id)
+        .filter(ProjectModel.owner_id == current_user["id"])
         .group_by(Message.project_id)
         .subquery()
     )
@@ -293,12 +290,7 @@ async def list_projects(
             }
 
         # Ensure all service types are represented
-        for provider in ["github", "supabase", "vercel"]:
-            if provider not in services:
-                services[provider] = {
-                    "connected": False,
-                    "status": "disconnected"
-                }
+        services = {**_default_services(), **services}
 
         # Extract AI-generated info from settings
         ai_info = project.settings or {}
@@ -333,8 +325,11 @@ async def get_project(
     """Get a specific project by ID (only if owned by current user)"""
 
     try:
-        project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-        if not project or project.owner_id != current_user["id"]:
+        project = db.query(ProjectModel).filter(
+            ProjectModel.id == project_id,
+            ProjectModel.owner_id == current_user["id"]
+        ).first()
+        if not project:
             raise HTTPException(status_code=404, detail="Project not found")
 
         # Extract AI-generated info from settings
@@ -374,11 +369,6 @@ async def create_project(
     print(f"🔧 [CreateProject] Received request: {body}")
     print(f"🔧 [CreateProject] CLI: {body.preferred_cli}, Model: {body.selected_model}")
 
-    # Check if project already exists (by id, but scoped by user)
-    existing = db.query(ProjectModel).filter(ProjectModel.id == body.project_id).first()
-    if existing:
-        raise HTTPException(status_code=409, detail=f"Project {body.project_id} already exists")
-
     # Create database record with initializing status
     preferred_cli = body.preferred_cli or "claude"
     # Set default model based on CLI
@@ -393,20 +383,29 @@ async def create_project(
     print(
         f"🔧 [CreateProject] Creating project {body.project_id} with CLI: {preferred_cli}, Model: {selected_model}, Fallback: {fallback_enabled}")
 
-    project = ProjectModel(
-        id=body.project_id,
-        name=body.name,
-        repo_path=None,  # Will be set after initialization
-        initial_prompt=body.initial_prompt,
-        status="initializing",  # Set to initializing
-        created_at=datetime.utcnow(),
-        preferred_cli=preferred_cli,
-        selected_model=selected_model,
-        fallback_enabled=fallback_enabled,
-        owner_id=current_user["id"],
+    # Insert atomically; an existing id makes ON CONFLICT skip the row
+    stmt = (
+        dialect_insert(db, ProjectModel)
+        .values(
+            id=body.project_id,
+            name=body.name,
+            repo_path=None,  # Will be set after initialization
+            initial_prompt=body.initial_prompt,
+            status="initializing",  # Set to initializing
+            created_at=datetime.utcnow(),
+            preferred_cli=preferred_cli,
+            selected_model=selected_model,
+            fallback_enabled=fallback_enabled,
+            owner_id=current_user["id"],
+        )
+        .on_conflict_do_nothing(index_elements=[ProjectModel.id])
+        .returning(ProjectModel)
     )
+    project = db.execute(stmt).scalar_one_or_none()
+    if project is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Project {body.project_id} already exists")
 
-    db.add(project)
     db.commit()
     db.refresh(project)
 
@@ -431,11 +430,7 @@ async def create_project(
         created_at=project.created_at,
         last_active_at=project.last_active_at,
         last_message_at=None,
-        services={
-            "github": {"connected": False, "status": "disconnected"},
-            "supabase": {"connected": False, "status": "disconnected"},
-            "vercel": {"connected": False, "status": "disconnected"}
-        },
+        services=_default_services(),
         features=[],
         tech_stack=["Next.js", "React", "TypeScript"],
         ai_generated=False,  # Will be updated after AI processing
@@ -452,8 +447,11 @@ async def update_project(
 ) -> Project:
     """Update a project (only owner)"""
 
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-    if not project or project.owner_id != current_user["id"]:
+    project = db.query(ProjectModel).filter(
+        ProjectModel.id == project_id,
+        ProjectModel.owner_id == current_user["id"]
+    ).first()
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     # Update project name
@@ -479,12 +477,7 @@ async def update_project(
         }
 
     # Ensure all service types are represented
-    for provider in ["github", "supabase", "vercel"]:
-        if provider not in services:
-            services[provider] = {
-                "connected": False,
-                "status": "disconnected"
-            }
+    services = {**_default_services(), **services}
 
     # Extract AI-generated info from settings
     ai_info = project.settings or {}
@@ -516,8 +509,11 @@ async def delete_project(
 ):
     """Delete a project (only owner)"""
 
-    project = db.query(ProjectModel).filter(ProjectModel.id == project_id).first()
-    if not project or project.owner_id != current_user["id"]:
+    project = db.query(ProjectModel).filter(
+        ProjectModel.id == project_id,
+        ProjectModel.owner_id == current_user["id"]
+    ).first()
+    if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     # Delete associated messages
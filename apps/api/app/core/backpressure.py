@@ -0,0 +1,199 @@
+"""
+Adaptive admission control for upstream calls (Claude SDK/CLI, third-party HTTP APIs)
+
+AIMD like TCP congestion control: the allowed concurrency grows by a fixed step after each
+healthy upstream response and is halved on 429/5xx. Upstream ``Retry-After`` hints pause new
+admissions. Each upstream has its own controller so one provider's throttling never limits
+another. RateLimitMiddleware scales its per-minute write limit by the Claude controller's
+``scale()`` so the API sheds load before upstream throttling turns into a retry storm.
+"""
+import asyncio
+import contextlib
+import functools
+import logging
+import re
+from collections import deque
+from email.utils import parsedate_to_datetime
+from time import monotonic as _mono, time as _time
+from typing import Any, Mapping, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Never honour an upstream pause longer than this
+_MAX_PAUSE_SEC = 300.0
+_THROTTLE_STATUSES = frozenset({429, 503, 529})
+_REMAINING_HEADERS = ("anthropic-ratelimit-requests-remaining", "x-ratelimit-remaining")
+# Status codes only as whole numbers, so ids/paths/byte counts containing "429" don't match
+_THROTTLE_TEXT = re.compile(r"\b(?:429|529)\b|rate[ _]limit|too many requests|overloaded")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - _time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Best-effort check whether an SDK/HTTP exception means the upstream is throttling us."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if isinstance(status, int):
+        return status in _THROTTLE_STATUSES or status >= 500
+    return _THROTTLE_TEXT.search(str(exc).lower()) is not None
+
+
+class UpstreamAdmissionTimeout(Exception):
+    """No upstream slot freed up in time. Local queueing, not an upstream fault: callers shouldn't
+    retry it or count it against the upstream's health."""
+
+
+class BackpressureController:
+    """AIMD concurrency limit for outbound calls to one upstream."""
+
+    def __init__(
+            self,
+            c_min: float = 1.0,
+            c_max: float = 8.0,
+            latency_target: Optional[float] = None,
+            increase: float = 0.5,
+            decrease: float = 0.5,
+            acquire_timeout: Optional[float] = None,
+    ):
+        self.c_min = c_min
+        self.c_max = max(c_min, c_max)
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+        self.acquire_timeout = acquire_timeout
+        self.current_concurrency = self.c_max
+        self._in_flight = 0
+        self._paused_until = 0.0
+        # FIFO of callers waiting for a slot; a slot is handed over by resolving the future
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def scale(self) -> float:
+        """Fraction of full capacity currently admitted, in (0, 1]."""
+        if _mono() < self._paused_until:
+            return self.c_min / self.c_max
+        return self.current_concurrency / self.c_max
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        # Additive increase, only while under the latency target (if one is set)
+        if self.latency_target and latency is not None and latency > self.latency_target:
+            return
+        self.current_concurrency = min(self.c_max, self.current_concurrency + self.increase)
+        self._grant()
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        # Multiplicative decrease; an explicit upstream hint also pauses new admissions
+        self.current_concurrency = max(self.c_min, self.current_concurrency * self.decrease)
+        if retry_after:
+            self._paused_until = max(self._paused_until, _mono() + min(retry_after, _MAX_PAUSE_SEC))
+        logger.warning(
+            "Upstream throttling; concurrency limit now %.1f (retry_after=%s)",
+            self.current_concurrency, retry_after,
+        )
+
+    def observe(self, status: int, headers: Mapping[str, Any], latency: Optional[float] = None) -> None:
+        """Feed one upstream HTTP response (status + headers) into the controller."""
+        retry_after = parse_retry_after(headers.get("retry-after"))
+        if status in _THROTTLE_STATUSES or status >= 500:
+            self.record_throttle(retry_after)
+            return
+        # Provider says the quota is exhausted: back off before it starts returning 429s
+        if any(str(headers.get(h, "")).strip() == "0" for h in _REMAINING_HEADERS):
+            self.record_throttle(retry_after)
+            return
+        self.record_success(latency)
+
+    def _grant(self) -> None:
+        while self._waiters and self._in_flight < int(self.current_concurrency):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait for a slot; raises UpstreamAdmissionTimeout after ``timeout`` (default ``acquire_timeout``)."""
+        if timeout is None:
+            timeout = self.acquire_timeout
+        deadline = None if timeout is None else _mono() + timeout
+        delay = self._paused_until - _mono()
+        if delay > 0:
+            if deadline is not None and _mono() + delay > deadline:
+                await asyncio.sleep(max(0.0, deadline - _mono()))
+                raise UpstreamAdmissionTimeout(f"upstream paused for {delay:.0f}s")
+            await asyncio.sleep(delay)
+        if not self._waiters and self._in_flight < int(self.current_concurrency):
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, None if deadline is None else max(0.0, deadline - _mono()))
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up: hand the slot to the next waiter
+                self._release_slot()
+            else:
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise UpstreamAdmissionTimeout(f"no upstream slot within {timeout:.0f}s") from None
+            raise
+
+    def _release_slot(self) -> None:
+        self._in_flight -= 1
+        self._grant()
+
+    async def release(self) -> None:
+        self._release_slot()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one upstream concurrency slot for the duration of the block."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+
+@functools.lru_cache(maxsize=None)
+def get_backpressure(upstream: str = "claude") -> BackpressureController:
+    """Process-wide controller for one upstream (``"claude"``, ``"github"``, ...)."""
+    settings = get_settings()
+    latency_ms = settings.upstream_latency_target_ms
+    return BackpressureController(
+        c_max=float(settings.upstream_max_concurrency),
+        latency_target=(latency_ms / 1000.0) if latency_ms > 0 else None,
+        acquire_timeout=float(settings.upstream_acquire_timeout_sec) or None,
+    )
+
+
+def observe_httpx_response(upstream: str):
+    """httpx ``event_hooks`` response hook reporting status/headers to ``upstream``'s controller."""
+    async def _hook(response) -> None:
+        get_backpressure(upstream).observe(response.status_code, response.headers)
+
+    return _hook
+
+
+__all__ = [
+    "BackpressureController",
+    "get_backpressure",
+    "UpstreamAdmissionTimeout",
+    "is_throttle_error",
+    "observe_httpx_response",
+    "parse_retry_after",
+]
@@ -1,5 +1,7 @@
 import sys
+import time
 
+from app.core.config import TRUTHY
 from app.core.terminal_ui import TerminalUIHandler
 
 import logging
@@ -13,7 +15,12 @@ def configure_logging() -> None:
     """
     import os
     debug_env = os.getenv("DEBUG", "false").strip().lower()
-    debug_enabled = debug_env in ("1", "true", "yes", "on")
+    debug_enabled = debug_env in TRUTHY
+
+    # No formatter uses thread/process fields; skip collecting them per LogRecord
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
 
     # Clear existing handlers
     root = logging.getLogger()
@@ -26,9 +33,12 @@ def configure_logging() -> None:
     # Add standard handler for stdout when debugging
     stream_handler = logging.StreamHandler(sys.stdout)
     formatter = logging.Formatter(
-        fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S%z",
+        fmt="{asctime} {levelname} [{name}] {message}",
+        datefmt="%Y-%m-%dT%H:%M:%SZ",
+        style="{",
     )
+    # UTC timestamps skip the local timezone conversion on every record
+    formatter.converter = time.gmtime
     stream_handler.setFormatter(formatter)
     stream_handler.setLevel(logging.DEBUG)
 
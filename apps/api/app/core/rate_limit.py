@@ -0,0 +1,302 @@
+"""
+Per-key request rate limiting middleware
+
+Counters live in Redis when REDIS_URL is configured (shared across workers and restarts,
+sliding-window counters), otherwise in per-process memory (token buckets). Redis errors
+fall back to the in-memory path.
+"""
+import base64
+import hashlib
+import logging
+import math
+import random
+import threading
+from collections import OrderedDict
+from time import monotonic as _mono, time as _time
+from typing import Optional
+
+import orjson
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.backpressure import get_backpressure
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MINUTE_WINDOW = 60.0
+_DAY_WINDOW = 86400.0
+
+# Sliding-window counter (two-bucket approximation) over Redis' own clock: the previous
+# window's count is weighted by how much of it still overlaps the trailing window, which
+# avoids the 2x burst a plain fixed window allows at its edge. Counters are only bumped
+# when the request is admitted. Returns {allowed, minute_used, day_used, retry_after_ms}.
+_REDIS_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local function window(base, size)
+  local idx = math.floor(now / size)
+  local prev = tonumber(redis.call('GET', base .. ':' .. (idx - 1))) or 0
+  local cur = tonumber(redis.call('GET', base .. ':' .. idx)) or 0
+  local elapsed = now - idx * size
+  return base .. ':' .. idx, prev, cur, elapsed, prev * (1 - elapsed / size) + cur
+end
+
+local function retry_ms(prev, cur, elapsed, size, limit)
+  if cur + 1 > limit or prev == 0 then
+    return math.ceil((size - elapsed) * 1000)
+  end
+  -- when the previous window's weighted share has decayed enough to admit one more
+  return math.max(1, math.ceil((size * (1 - (limit - 1 - cur) / prev) - elapsed) * 1000))
+end
+
+local mw, dw = tonumber(ARGV[1]), tonumber(ARGV[2])
+local ml, dl = tonumber(ARGV[3]), tonumber(ARGV[4])
+local mk, mp, mc, me, m_est = window(KEYS[1], mw)
+local dk, dp, dc, de, d_est = window(KEYS[2], dw)
+
+if m_est + 1 > ml then
+  return {0, math.floor(m_est), math.floor(d_est), retry_ms(mp, mc, me, mw, ml)}
+end
+if d_est + 1 > dl then
+  return {0, math.floor(m_est), math.floor(d_est), retry_ms(dp, dc, de, dw, dl)}
+end
+redis.call('INCR', mk)
+redis.call('EXPIRE', mk, 2 * mw)
+redis.call('INCR', dk)
+redis.call('EXPIRE', dk, 2 * dw)
+return {1, math.floor(m_est) + 1, math.floor(d_est) + 1, 0}
+"""
+_REDIS_RETRY_SEC = 30.0
+
+# Pre-encoded header names, appended straight to response.raw_headers
+_H_LIMIT_MINUTE = b"x-ratelimit-limit-minute"
+_H_LIMIT_DAY = b"x-ratelimit-limit-day"
+
+# Stable 429 envelope, serialized once; only retry_after is spliced in per response
+_RATE_LIMITED_HEAD = orjson.dumps(
+    {"ok": False, "code": "agent.rate_limited", "message": "Rate limit exceeded"}
+)[:-1] + b',"retry_after":'
+# Up to +20% on Retry-After so throttled clients don't all come back on the same tick
+_RETRY_JITTER = 0.2
+
+# High-frequency, cheap endpoints that skip rate-limit bookkeeping (plus the */requests/active poll)
+_SKIP_PATHS = frozenset({"/health", "/metrics", "/favicon.ico"})
+_SKIP_SUFFIX = "/requests/active"
+
+
+def _make_redis_client():
+    """Build an asyncio Redis client when REDIS_URL is set and redis-py is installed."""
+    if not settings.redis_url:
+        return None
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        logger.warning("REDIS_URL is set but the redis package is not installed; using in-memory rate limits")
+        return None
+    return redis_asyncio.Redis.from_url(settings.redis_url)
+
+# Buckets are independent per key, so state is split across shards with one lock each;
+# unrelated users never wait on each other. Must be a power of two (index uses a mask).
+_SHARD_COUNT = 64
+# Each shard is an LRU capped at this many keys; a key idle for a full day is dropped too,
+# which is lossless since both its buckets would have refilled completely by then
+_SHARD_MAX_KEYS = 100_000 // _SHARD_COUNT
+_BUCKET_IDLE_TTL = 86400.0
+
+# Decoded JWT subjects, keyed by a digest of the token so raw tokens aren't retained
+_SUB_CACHE_TTL = 5.0
+_SUB_CACHE_MAX = 10_000
+_sub_cache: "OrderedDict[bytes, tuple[Optional[str], float]]" = OrderedDict()
+_sub_cache_lock = threading.Lock()
+_B64_PAD = b"=="
+
+
+def _decode_sub(token: str) -> Optional[str]:
+    """Return the unverified ``sub``/``user_id`` claim of a JWT, cached for a few seconds."""
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = _time()
+    with _sub_cache_lock:
+        hit = _sub_cache.get(digest)
+        if hit is not None and hit[1] > now:
+            _sub_cache.move_to_end(digest)
+            return hit[0]
+
+    sub = None
+    expires_at = now + _SUB_CACHE_TTL
+    # Slice the payload segment between the first two dots without splitting the whole token
+    first_dot = token.find('.')
+    second_dot = token.find('.', first_dot + 1) if first_dot >= 0 else -1
+    if first_dot >= 0:
+        try:
+            payload_b64 = token[first_dot + 1:second_dot if second_dot >= 0 else None].encode('ascii')
+            payload = orjson.loads(base64.urlsafe_b64decode(payload_b64 + _B64_PAD[:-len(payload_b64) % 4]))
+            sub = payload.get('sub') or payload.get('user_id')
+            # Never cache past the token's own expiry
+            exp = payload.get('exp')
+            if isinstance(exp, (int, float)):
+                expires_at = min(expires_at, float(exp))
+        except Exception:
+            pass
+
+    with _sub_cache_lock:
+        _sub_cache[digest] = (sub, expires_at)
+        _sub_cache.move_to_end(digest)
+        if len(_sub_cache) > _SUB_CACHE_MAX:
+            _sub_cache.popitem(last=False)
+    return sub
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.redis = _make_redis_client()
+        self._redis_retry_at = 0.0
+        self.locks = [threading.Lock() for _ in range(_SHARD_COUNT)]
+        # key -> {"d_tokens": float, "d_ts": float, "<cls>_tokens": float, "<cls>_ts": float, ...}
+        # with one per-minute bucket per limit class ("r" reads, "w" writes) and a shared day bucket
+        self.shards = [OrderedDict() for _ in range(_SHARD_COUNT)]
+
+    def _tenant_id(self, request: Request) -> str:
+        # Derive tenant from explicit header or from Host (subdomain)
+        tid = (request.headers.get("X-Tenant-ID") or "").strip()
+        if tid:
+            return tid
+        host = (request.headers.get("host") or "").partition(":")[0]
+        # naive subdomain parsing: sub.domain.tld -> sub
+        if host and host.count(".") >= 2:
+            return host.partition(".")[0]
+        return "default"
+
+    def _key_for(self, request: Request) -> str:
+        # Prefer Supabase user id from unverified JWT for lightweight keying
+        # (Starlette headers are case-insensitive, so one lookup suffices)
+        auth = request.headers.get("authorization")
+        tenant = self._tenant_id(request)
+        if auth and auth.lower().startswith("bearer "):
+            sub = _decode_sub(auth.partition(" ")[2].strip())
+            if sub:
+                return f"t:{tenant}|uid:{sub}"
+        # Fallback to IP
+        ip = request.client.host if request.client else 'unknown'
+        return f"t:{tenant}|ip:{ip}"
+
+    def _check_local(
+            self, key: str, cls: str, now: float, m_limit: int, d_limit: int
+    ) -> tuple[bool, int, int, int]:
+        """In-memory token buckets; returns (allowed, retry_after, minute_remaining, day_remaining).
+
+        Reads and writes have different per-minute limits, so each ``cls`` gets its own minute
+        bucket (a POST must not clamp the GET allowance); the day bucket is shared.
+        """
+        idx = hash(key) & (_SHARD_COUNT - 1)
+        m_tokens_key, m_ts_key = f"{cls}_tokens", f"{cls}_ts"
+        # Token buckets: each refills continuously at limit/window tokens per second, so there is
+        # no window edge where a client can burst up to 2x the limit
+        with self.locks[idx]:
+            buckets = self.shards[idx]
+            data = buckets.get(key)
+            if data is None:
+                data = {"d_tokens": float(d_limit), "d_ts": now}
+                buckets[key] = data
+                # Evict least-recently-used keys that are idle past the TTL or over the cap
+                while buckets:
+                    oldest = next(iter(buckets.values()))
+                    if len(buckets) <= _SHARD_MAX_KEYS and now - oldest["d_ts"] < _BUCKET_IDLE_TTL:
+                        break
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+            # A class this key hasn't used yet starts full
+            m_tokens = data.get(m_tokens_key, float(m_limit))
+            m_tokens = min(m_limit, m_tokens + (now - data.get(m_ts_key, now)) * (m_limit / _MINUTE_WINDOW))
+            d_tokens = min(d_limit, data["d_tokens"] + (now - data["d_ts"]) * (d_limit / _DAY_WINDOW))
+            data[m_ts_key] = data["d_ts"] = now
+            if m_tokens < 1 or d_tokens < 1:
+                data[m_tokens_key], data["d_tokens"] = m_tokens, d_tokens
+                if m_tokens < 1:
+                    retry_after = math.ceil((1 - m_tokens) * _MINUTE_WINDOW / m_limit)
+                else:
+                    retry_after = math.ceil((1 - d_tokens) * _DAY_WINDOW / d_limit)
+                return False, max(1, retry_after), max(0, int(m_tokens)), max(0, int(d_tokens))
+            # Consume one token from each bucket
+            data[m_tokens_key] = m_tokens - 1
+            data["d_tokens"] = d_tokens - 1
+            return True, 0, int(data[m_tokens_key]), int(data["d_tokens"])
+
+    async def _check_redis(self, key: str, cls: str, m_limit: int, d_limit: int) -> tuple[bool, int, int, int]:
+        """Shared sliding-window counters in Redis; one EVAL round-trip per request.
+
+        Same layout as the local buckets: a minute counter per ``cls`` plus one day counter.
+        """
+        # Hash tag keeps both windows' keys in one cluster slot. The key embeds client-supplied
+        # values (X-Tenant-ID, JWT sub), so only a digest goes in the tag: a "}" can't split it
+        tag = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        allowed, m_used, d_used, retry_ms = await self.redis.eval(
+            _REDIS_LUA, 2, f"rl:{{{tag}}}:m:{cls}", f"rl:{{{tag}}}:d",
+            int(_MINUTE_WINDOW), int(_DAY_WINDOW), m_limit, d_limit,
+        )
+        retry_after = max(1, math.ceil(int(retry_ms) / 1000)) if not allowed else 0
+        return bool(allowed), retry_after, max(0, m_limit - int(m_used)), max(0, d_limit - int(d_used))
+
+    async def _check(self, key: str, cls: str, m_limit: int, d_limit: int) -> tuple[bool, int, int, int]:
+        # Monotonic clock: a wall-clock step (NTP) must not drain or overfill buckets
+        now = _mono()
+        if self.redis is not None and now >= self._redis_retry_at:
+            try:
+                return await self._check_redis(key, cls, m_limit, d_limit)
+            except Exception as e:
+                # Fall back to per-process buckets and give Redis a moment before retrying
+                logger.warning("Redis rate limiter unavailable, using in-memory buckets: %s", e)
+                self._redis_retry_at = now + _REDIS_RETRY_SEC
+        return self._check_local(key, cls, now, m_limit, d_limit)
+
+    async def dispatch(self, request: Request, call_next):
+        # Skip rate limiting for health checks/polling and WebSocket upgrades
+        path = request.url.path
+        if path in _SKIP_PATHS or path.endswith(_SKIP_SUFFIX):
+            return await call_next(request)
+        if request.headers.get("upgrade", "").lower() == "websocket":
+            return await call_next(request)
+
+        key = self._key_for(request)
+
+        # Method-aware limits (allow higher read throughput for GET)
+        is_get = (request.method.upper() == 'GET')
+        base_min_limit = settings.rate_limit_per_min
+        if is_get:
+            m_limit_effective = base_min_limit * 5
+        else:
+            # Writes are what fan out to Claude/GitHub, so shrink them with upstream backpressure
+            m_limit_effective = max(1, int(base_min_limit * get_backpressure().scale()))
+        d_limit = settings.rate_limit_per_day
+
+        allowed, retry_after, m_remaining, d_remaining = await self._check(
+            key, "r" if is_get else "w", m_limit_effective, d_limit
+        )
+        if not allowed:
+            # Return 429 with headers
+            from starlette.responses import Response
+            retry_after = math.ceil(retry_after + random.uniform(0, retry_after * _RETRY_JITTER))
+            headers = {
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Reset": str(int(_time()) + retry_after),
+                "X-RateLimit-Limit-Minute": str(m_limit_effective),
+                "X-RateLimit-Remaining-Minute": str(m_remaining),
+                "X-RateLimit-Limit-Day": str(d_limit),
+                "X-RateLimit-Remaining-Day": str(d_remaining),
+            }
+            body = b"%s%d}" % (_RATE_LIMITED_HEAD, retry_after)
+            return Response(body, status_code=429, headers=headers, media_type="application/json")
+
+        response = await call_next(request)
+        # Expose remaining counts
+        try:
+            response.raw_headers.extend((
+                (_H_LIMIT_MINUTE, str(m_limit_effective).encode("latin-1")),
+                (_H_LIMIT_DAY, str(d_limit).encode("latin-1")),
+            ))
+        except Exception:
+            pass
+        return response
@@ -12,6 +12,8 @@ from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
+from app.core.config import TRUTHY
+
 import logging
 
 
@@ -33,7 +35,7 @@ class TerminalUI:
     def __init__(self):
         import os
         dbg = (os.getenv("DEBUG", "false") or "").strip().lower()
-        self.debug_enabled = dbg in ("1", "true", "yes", "on")
+        self.debug_enabled = dbg in TRUTHY
         self.console = Console(file=sys.stdout, force_terminal=True)
         self._setup_colors()
 
@@ -27,10 +27,22 @@ def _to_async_url(url: str) -> str:
 
 ASYNC_DATABASE_URL: str = _to_async_url(settings.database_url)
 
+def _engine_kwargs(url: str) -> dict:
+    """Driver options for the async engine.
+
+    asyncpg keeps a per-connection prepared statement cache by default; it has to be
+    disabled when connections are multiplexed through PgBouncer in transaction mode.
+    """
+    kwargs: dict = {"pool_pre_ping": True}
+    if url.startswith("postgresql+asyncpg://") and settings.db_behind_pgbouncer:
+        kwargs["connect_args"] = {"prepared_statement_cache_size": 0, "statement_cache_size": 0}
+    return kwargs
+
+
 # Create async engine/session factory
 async_engine: AsyncEngine = create_async_engine(
     ASYNC_DATABASE_URL,
-    pool_pre_ping=True,
+    **_engine_kwargs(ASYNC_DATABASE_URL),
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -50,8 +62,5 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
             ...
     """
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            # session is closed by context manager
-            pass
+        # session is closed by context manager
+        yield session
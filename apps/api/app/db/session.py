@@ -31,6 +31,15 @@ if settings.database_url.startswith("sqlite"):
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
+def dialect_insert(db, table):
+    """Return an INSERT for the session's dialect (supports ON CONFLICT clauses)"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
+
+
 def get_db():
     """Database session dependency"""
     db = SessionLocal()
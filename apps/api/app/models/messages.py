@@ -51,3 +51,17 @@ class Message(Base):
     project = relationship("Project", back_populates="messages")
     parent_message = relationship("Message", remote_side=[id], backref="replies")
     session = relationship("Session", back_populates="messages")
+
+    def to_ws_dict(self, conversation_id: str | None = None) -> dict:
+        """The ``data`` part of a WebSocket "message" event (created_at formatted once)."""
+        return {
+            "id": self.id,
+            "role": self.role,
+            "message_type": self.message_type,
+            "content": self.content,
+            "metadata": self.metadata_json,
+            "parent_message_id": self.parent_message_id,
+            "session_id": self.session_id,
+            "conversation_id": conversation_id or self.conversation_id,
+            "created_at": self.created_at.isoformat(),
+        }
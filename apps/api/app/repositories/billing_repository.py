@@ -2,11 +2,25 @@ from __future__ import annotations
 
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
 from app.models.billing import UserAccount
 
+# Built once so SQLAlchemy's compiled-statement cache is hit on every call; only the
+# columns profile enrichment reads are fetched
+_GET_ACCOUNT = (
+    select(UserAccount)
+    .options(load_only(
+        UserAccount.owner_id,
+        UserAccount.plan,
+        UserAccount.credit_balance,
+        UserAccount.subscription_status,
+    ))
+    .where(UserAccount.owner_id == bindparam("owner_id"))
+)
+
 
 class BillingRepository:
     """Read-only repository for billing account data used by user profile enrichment."""
@@ -16,5 +30,5 @@ class BillingRepository:
         self.db = db
 
     async def get_account(self, owner_id: str) -> Optional[UserAccount]:
-        result = await self.db.execute(select(UserAccount).where(UserAccount.owner_id == owner_id))
+        result = await self.db.execute(_GET_ACCOUNT, {"owner_id": owner_id})
         return result.scalar_one_or_none()
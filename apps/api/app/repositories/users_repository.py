@@ -1,12 +1,38 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Iterable, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, load_only
 
+from app.db.session import dialect_insert
+from app.models.billing import UserAccount
 from app.models.user_profiles import UserProfile
 
+# Module-level so the compiled form is reused; created_at is never read by the service layer
+_GET_BY_OWNER_ID = (
+    select(UserProfile)
+    .options(defer(UserProfile.created_at))
+    .where(UserProfile.owner_id == bindparam("owner_id"))
+)
+
+# Profile plus its billing account in one round trip (account columns as in BillingRepository)
+_GET_WITH_ACCOUNT = (
+    select(UserProfile, UserAccount)
+    .outerjoin(UserAccount, UserAccount.owner_id == UserProfile.owner_id)
+    .options(
+        defer(UserProfile.created_at),
+        load_only(
+            UserAccount.owner_id,
+            UserAccount.plan,
+            UserAccount.credit_balance,
+            UserAccount.subscription_status,
+        ),
+    )
+    .where(UserProfile.owner_id == bindparam("owner_id"))
+)
+
 
 class UsersRepository:
     """Repository for user profile persistence.
@@ -18,9 +44,18 @@ class UsersRepository:
         self.db = db
 
     async def get_by_owner_id(self, owner_id: str) -> Optional[UserProfile]:
-        result = await self.db.execute(select(UserProfile).where(UserProfile.owner_id == owner_id))
+        result = await self.db.execute(_GET_BY_OWNER_ID, {"owner_id": owner_id})
         return result.scalar_one_or_none()
 
+    async def get_profile_with_account(
+            self, owner_id: str
+    ) -> Tuple[Optional[UserProfile], Optional[UserAccount]]:
+        result = await self.db.execute(_GET_WITH_ACCOUNT, {"owner_id": owner_id})
+        row = result.first()
+        if row is None:
+            return None, None
+        return row[0], row[1]
+
     async def insert(self, profile: UserProfile) -> UserProfile:
         self.db.add(profile)
         await self.db.flush()
@@ -30,3 +65,12 @@ class UsersRepository:
         # SQLAlchemy tracks changes; flush ensures SQL side effects before commit
         await self.db.flush()
         return profile
+
+    async def upsert(self, owner_id: str, values: dict[str, Any], update_columns: Iterable[str]) -> None:
+        """Insert a profile, or overwrite ``update_columns`` on the existing row, in one statement."""
+        stmt = dialect_insert(self.db, UserProfile).values(owner_id=owner_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserProfile.owner_id],
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+        await self.db.execute(stmt)
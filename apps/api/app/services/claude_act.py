@@ -1,19 +1,34 @@
+import asyncio
+import functools
+import logging
 import os
-from datetime import datetime
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Tuple, Optional, Callable, Dict, List
 
+from app.core.backpressure import UpstreamAdmissionTimeout, get_backpressure, is_throttle_error
+from app.core.config import TRUTHY
 from claude_code_sdk import query, ClaudeCodeOptions
 from claude_code_sdk.types import (
     AssistantMessage, ResultMessage,
     TextBlock, ThinkingBlock, ToolUseBlock, ToolResultBlock
 )
 
+logger = logging.getLogger(__name__)
+
 # Prefer newest model by env; fallback to stable Claude Sonnet 4.5
 DEFAULT_MODEL = os.getenv("CLAUDE_CODE_MODEL", "claude-sonnet-4-5-20250929")
 
-# Cache for system prompt variants
-_PROMPT_CACHE: Dict[str, str] = {}
+# Streamed log payload limits, read once at import
+_MAX_LOG_TEXT_CHARS = int(os.getenv("MAX_LOG_TEXT_CHARS", "1200") or "1200")
+_LOG_THINKING = (os.getenv("LOG_THINKING", "0") or "0").strip().lower() in TRUTHY
+_MAX_LOG_THINKING_CHARS = int(os.getenv("MAX_LOG_THINKING_CHARS", "200") or "200")
+# >0 merges consecutive text events arriving within this many ms into one callback frame
+_LOG_COALESCE_MS = int(os.getenv("LOG_COALESCE_MS", "0") or "0")
+
+# Dev only: re-stat prompt files on each lookup and recompose when they change
+_PROMPT_HOT_RELOAD = (os.getenv("PROMPT_HOT_RELOAD", "0") or "0").strip().lower() in TRUTHY
 
 
 # ==========================================================
@@ -25,18 +40,36 @@ def _prompt_dir() -> Path:
     return Path(__file__).resolve().parent.parent / "prompt"
 
 
+# Prompt markdown is a few KB; anything beyond this is not a prompt file
+_MAX_PROMPT_BYTES = 1 << 20
+
+
 def _read_file_safe(p: Path) -> Optional[str]:
+    # Prompts are composed once at import, so a single open + read (no stat pre-checks) suffices
+    try:
+        fd = os.open(p, os.O_RDONLY)
+    except OSError:
+        return None
     try:
-        if p.exists() and p.is_file():
-            return p.read_text(encoding="utf-8").strip()
-    except Exception as e:
-        print(f"❌ Could not read prompt file {p}: {e}")
-    return None
+        data = os.read(fd, _MAX_PROMPT_BYTES)
+    except OSError as e:
+        # e.g. IsADirectoryError
+        logger.debug("Could not read prompt file %s: %s", p, e)
+        return None
+    finally:
+        os.close(fd)
+    try:
+        return data.decode("utf-8").strip()
+    except UnicodeDecodeError as e:
+        logger.debug("Could not decode prompt file %s: %s", p, e)
+        return None
 
 
+@functools.lru_cache(maxsize=1)
 def _find_prompt_variants() -> Dict[str, Path]:
     """
     Locate system-core.md, system-design.md, system-build.md with fallbacks.
+    The prompt directory is static per process, so the lookup is memoized.
     """
     base = _prompt_dir()
     variants = {
@@ -70,23 +103,7 @@ def _compose_system_prompt(first_run: bool) -> str:
       • Subsequent runs (existing project): use only core + design prompts (no build section).
     Falls back to minimal prompt if none found.
     """
-    # Include prompt file mtimes in cache key so updates take effect without restart
     resolved = _find_prompt_variants()
-    try:
-        mtime_bits = []
-        for key, p in resolved.items():
-            try:
-                mtime_bits.append(f"{key}={int(p.stat().st_mtime_ns)}")
-            except Exception:
-                mtime_bits.append(f"{key}=0")
-        mtime_key = ":".join(sorted(mtime_bits))
-    except Exception:
-        mtime_key = ""
-    cache_key = f"first_run={first_run}|{mtime_key}"
-    if cache_key in _PROMPT_CACHE:
-        return _PROMPT_CACHE[cache_key]
-
-    # resolved already computed above
 
     # 1) First run: prefer legacy single prompt for project bootstrapping
     if first_run:
@@ -94,8 +111,7 @@ def _compose_system_prompt(first_run: bool) -> str:
         if legacy_file:
             txt = _read_file_safe(legacy_file)
             if txt:
-                print("✅ Using system-prompt.md for initial project setup")
-                _PROMPT_CACHE[cache_key] = txt
+                logger.info("Using system-prompt.md for initial project setup")
                 return txt
         # Fallback: if legacy not found, use core + design
         core_txt = _read_file_safe(resolved.get("core", Path()))
@@ -107,8 +123,7 @@ def _compose_system_prompt(first_run: bool) -> str:
             parts.append("\n\n---\n\n" + design_txt)
         composed = "\n".join(parts).strip()
         if composed:
-            print("⚠️ system-prompt.md missing; using core + design for initial setup")
-            _PROMPT_CACHE[cache_key] = composed
+            logger.warning("system-prompt.md missing; using core + design for initial setup")
             return composed
 
     # 2) Non‑initial runs: use core + design only
@@ -121,8 +136,7 @@ def _compose_system_prompt(first_run: bool) -> str:
         parts.append("\n\n---\n\n" + design_txt)
     composed = "\n".join(parts).strip()
     if composed:
-        print("✅ Loaded system prompts (core + design) for existing project")
-        _PROMPT_CACHE[cache_key] = composed
+        logger.info("Loaded system prompts (core + design) for existing project")
         return composed
 
     # Final fallback: hardcoded minimal prompt
@@ -132,11 +146,33 @@ def _compose_system_prompt(first_run: bool) -> str:
         "with high-quality code, performance, and design. Use Next.js, TypeScript, and Tailwind "
         "best practices. Maintain clarity, accessibility, and production-readiness."
     )
-    print("🛟 Using minimal fallback system prompt (no files found)")
-    _PROMPT_CACHE[cache_key] = fallback
+    logger.warning("Using minimal fallback system prompt (no prompt files found)")
     return fallback
 
 
+def _prompt_mtimes() -> Tuple[int, ...]:
+    mtimes = []
+    for p in _find_prompt_variants().values():
+        try:
+            mtimes.append(os.stat(p).st_mtime_ns)
+        except OSError:
+            mtimes.append(0)
+    return tuple(mtimes)
+
+
+def _build_prompts() -> None:
+    """(Re)compose both prompt variants into module constants."""
+    global _PROMPT_FIRST_RUN, _PROMPT_RESUME, _PROMPT_MTIMES
+    _PROMPT_MTIMES = _prompt_mtimes()
+    _PROMPT_FIRST_RUN = _compose_system_prompt(True)
+    _PROMPT_RESUME = _compose_system_prompt(False)
+
+
+# Composed once at import: no filesystem access on the request path, and the prompt
+# prefix is byte-identical for every call in (and across) processes
+_build_prompts()
+
+
 def _agents_dir() -> Path:
     return _prompt_dir() / "agents"
 
@@ -156,7 +192,9 @@ def _read_agent_prompt(name: Optional[str]) -> str:
 
 def get_system_prompt(first_run: bool = False, sub_agent: Optional[str] = None) -> str:
     """Public accessor for dynamic prompt composition with optional sub‑agent layer."""
-    base = _compose_system_prompt(first_run)
+    if _PROMPT_HOT_RELOAD and _prompt_mtimes() != _PROMPT_MTIMES:
+        _build_prompts()
+    base = _PROMPT_FIRST_RUN if first_run else _PROMPT_RESUME
     agent_txt = _read_agent_prompt(sub_agent)
     if agent_txt:
         return f"{base}\n\n---\n\n{agent_txt}".strip()
@@ -171,7 +209,8 @@ def get_initial_system_prompt() -> str:
 # ✅ Backward compatibility (for imports in system_prompt.py)
 def load_system_prompt(force_reload: bool = False) -> str:
     if force_reload:
-        _PROMPT_CACHE.clear()
+        _find_prompt_variants.cache_clear()
+        _build_prompts()
     return get_system_prompt(False)
 
 
@@ -179,33 +218,185 @@ def load_system_prompt(force_reload: bool = False) -> str:
 # 🧩 TOOL SUMMARY HELPERS
 # ==========================================================
 
+def _bash_summary(tool_input: dict) -> str:
+    cmd = tool_input.get("command", "")
+    if len(cmd) > 60:
+        return f"💻 Running: {cmd[:60]}..."
+    return f"💻 Running: {cmd}"
+
+
+def _edit_summary(tool_input: dict) -> str:
+    return f"🔧 Editing: {tool_input.get('file_path', 'unknown')}"
+
+
+# One dict lookup per streamed tool-use block instead of an if/elif chain
+_TOOL_SUMMARIES: Dict[str, Callable[[dict], str]] = {
+    "Read": lambda i: f"📖 Reading: {i.get('file_path', 'unknown')}",
+    "Write": lambda i: f"✏️ Writing: {i.get('file_path', 'unknown')}",
+    "Edit": _edit_summary,
+    "MultiEdit": _edit_summary,
+    "Bash": _bash_summary,
+    "Glob": lambda i: f"🔍 Searching: {i.get('pattern', 'unknown')}",
+    "Grep": lambda i: f"🔎 Grepping: {i.get('pattern', 'unknown')}",
+    "LS": lambda i: f"📁 Listing: {i.get('path', 'current dir')}",
+    "WebFetch": lambda i: f"🌐 Fetching: {i.get('url', 'unknown')}",
+    "TodoWrite": lambda i: "📝 Managing todos",
+}
+
+
 def extract_tool_summary(tool_name: str, tool_input: dict) -> str:
-    if tool_name == "Read":
-        return f"📖 Reading: {tool_input.get('file_path', 'unknown')}"
-    elif tool_name == "Write":
-        return f"✏️ Writing: {tool_input.get('file_path', 'unknown')}"
-    elif tool_name in {"Edit", "MultiEdit"}:
-        return f"🔧 Editing: {tool_input.get('file_path', 'unknown')}"
-    elif tool_name == "Bash":
-        cmd = tool_input.get("command", "")
-        return f"💻 Running: {cmd[:60]}{'...' if len(cmd) > 60 else ''}"
-    elif tool_name == "Glob":
-        return f"🔍 Searching: {tool_input.get('pattern', 'unknown')}"
-    elif tool_name == "Grep":
-        return f"🔎 Grepping: {tool_input.get('pattern', 'unknown')}"
-    elif tool_name == "LS":
-        return f"📁 Listing: {tool_input.get('path', 'current dir')}"
-    elif tool_name == "WebFetch":
-        return f"🌐 Fetching: {tool_input.get('url', 'unknown')}"
-    elif tool_name == "TodoWrite":
-        return "📝 Managing todos"
-    return f"🔧 Using {tool_name}"
+    summarize = _TOOL_SUMMARIES.get(tool_name)
+    if summarize is None:
+        return f"🔧 Using {tool_name}"
+    return summarize(tool_input)
 
 
 # ==========================================================
 # 🚀 MAIN EXECUTION WITH STREAMING
 # ==========================================================
 
+class _TagCapture:
+    """Streaming extractor for the first ``<TAG>...</TAG>`` span (OUTSIDE -> INSIDE -> DONE).
+
+    Chunks are scanned as they arrive with a carried overlap of ``len(tag) - 1`` chars, so a
+    tag split across two chunks is still found and the full response is never re-scanned.
+    At most ``max_chars`` of the span are retained, so memory stays bounded even if the
+    closing tag never arrives.
+    """
+
+    __slots__ = ("_open", "_close", "_max_chars", "_inside", "_tail", "_parts", "_size", "done", "value")
+
+    def __init__(self, tag: str, max_chars: int = 4000):
+        self._open = f"<{tag}>"
+        self._close = f"</{tag}>"
+        self._max_chars = max_chars
+        self._inside = False
+        self._tail = ""
+        self._parts: List[str] = []
+        self._size = 0
+        self.done = False
+        self.value: Optional[str] = None
+
+    def feed(self, chunk: str) -> None:
+        if self.done:
+            return
+        buf = self._tail + chunk
+        if not self._inside:
+            i = buf.find(self._open)
+            if i < 0:
+                self._tail = buf[1 - len(self._open):]
+                return
+            self._inside = True
+            buf = buf[i + len(self._open):]
+        j = buf.find(self._close)
+        if j < 0:
+            # Hold back a possible partial closing tag; the rest is captured content
+            keep = len(self._close) - 1
+            if len(buf) > keep:
+                self._append(buf[:-keep])
+                buf = buf[-keep:]
+            self._tail = buf
+            return
+        self._append(buf[:j])
+        self.value = "".join(self._parts).strip()
+        self._parts = []
+        self._tail = ""
+        self.done = True
+
+    def _append(self, text: str) -> None:
+        room = self._max_chars - self._size
+        if room > 0:
+            text = text[:room]
+            self._parts.append(text)
+            self._size += len(text)
+
+
+def _cap(text: str, limit: int) -> str:
+    """Truncate for logging; returns ``text`` itself (no copy) when it already fits."""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return text[:limit] + "..."
+
+
+def _tool_result_preview(content, limit: int = 400) -> str:
+    # Plain-string results are sliced directly; only structured content needs str() first
+    if not isinstance(content, str):
+        content = str(content)
+    return content if len(content) <= limit else content[:limit]
+
+
+# Only the instruction varies; the invariant tail is built once
+_USER_PROMPT_PREFIX = "Task: "
+_USER_PROMPT_SUFFIX = (
+    "\n\n"
+    "Implement the requested changes to this Next.js project. "
+    "After completing, summarize using:\n"
+    "<COMMIT_MSG>commit message</COMMIT_MSG>\n"
+    "<SUMMARY>summary of changes</SUMMARY>"
+)
+
+class _CoalescingLogger:
+    """Wraps a log callback and merges consecutive ``text`` events into one frame.
+
+    Text is buffered until ``window_s`` has passed since the first buffered chunk or
+    ``max_chars`` accumulate; any other event kind flushes the buffer first so ordering
+    is preserved.
+    """
+
+    def __init__(self, callback: Callable, window_s: float, max_chars: int = 4096):
+        self._callback = callback
+        self._window_s = window_s
+        self._max_chars = max_chars
+        self._parts: List[str] = []
+        self._size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, kind: str, payload: dict) -> None:
+        if kind == "text":
+            content = payload.get("content") or ""
+            self._parts.append(content)
+            self._size += len(content)
+            if self._size >= self._max_chars:
+                await self.flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self._window_s, self._on_timer)
+            return
+        async with self._lock:
+            await self._drain()
+            await self._callback(kind, payload)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._drain()
+
+    async def _drain(self) -> None:
+        # Caller holds self._lock
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._parts:
+            return
+        parts, self._parts, self._size = self._parts, [], 0
+        await self._callback("text", {"content": "".join(parts), "segments": len(parts)})
+
+
+# Max tool_use entries awaiting their result; oldest are dropped first
+_PENDING_TOOL_CAP = 256
+
+# To avoid Windows command-line length issues, do not pass large system prompts directly.
+# Instead, append a compact policy prompt that enforces Vrabby identity and output rules.
+# Kept byte-identical across calls so the CLI's prompt-cache prefix stays warm.
+_COMPACT_POLICY = (
+    "You are Vrabby. Be concise. End with exactly one short, friendly sentence. "
+    "Do not include commands, URLs, ports, env details, or change logs."
+)
+
 async def generate_diff_with_logging(
         instruction: str,
         allow_globs: list[str],
@@ -222,13 +413,7 @@ async def generate_diff_with_logging(
 
     is_first_run = resume_session_id is None
 
-    user_prompt = (
-        f"Task: {instruction}\n\n"
-        "Implement the requested changes to this Next.js project. "
-        "After completing, summarize using:\n"
-        "<COMMIT_MSG>commit message</COMMIT_MSG>\n"
-        "<SUMMARY>summary of changes</SUMMARY>"
-    )
+    user_prompt = _USER_PROMPT_PREFIX + instruction + _USER_PROMPT_SUFFIX
 
     effective_prompt = (
         system_prompt.strip()
@@ -236,28 +421,73 @@ async def generate_diff_with_logging(
         else get_system_prompt(first_run=is_first_run)
     )
 
-    # To avoid Windows command-line length issues, do not pass large system prompts directly.
-    # Instead, append a compact policy prompt that enforces Vrabby identity and output rules.
-    compact_policy = (
-        "You are Vrabby. Be concise. End with exactly one short, friendly sentence. "
-        "Do not include commands, URLs, ports, env details, or change logs."
-    )
     options = ClaudeCodeOptions(
         cwd=repo_path,
         allowed_tools=["Read", "Write", "Edit", "MultiEdit", "Bash", "Glob", "Grep", "LS"],
         permission_mode="acceptEdits",
         model=DEFAULT_MODEL,
         resume=resume_session_id,
-        append_system_prompt=compact_policy,
+        append_system_prompt=_COMPACT_POLICY,
     )
 
-    response_text = ""
-    messages_received: List[str] = []
-    pending_tools = {}
+    # Commit message / summary are captured while streaming; the response itself isn't kept
+    commit_capture = _TagCapture("COMMIT_MSG")
+    summary_capture = _TagCapture("SUMMARY")
+    pending_tools: "OrderedDict[str, dict]" = OrderedDict()
     current_session_id = None
-    start_time = datetime.now()
-
+    start_ns = time.monotonic_ns()
+
+    coalescer: Optional[_CoalescingLogger] = None
+    if log_callback and _LOG_COALESCE_MS > 0:
+        log_callback = coalescer = _CoalescingLogger(log_callback, _LOG_COALESCE_MS / 1000)
+
+    # Per-block handlers keyed by exact SDK type (the SDK's block dataclasses aren't subclassed);
+    # without a callback only text needs handling, for the commit/summary capture
+    async def _on_text(block: TextBlock) -> None:
+        if not summary_capture.done or not commit_capture.done:
+            commit_capture.feed(block.text)
+            summary_capture.feed(block.text)
+        if log_callback:
+            await log_callback("text", {"content": _cap(block.text, _MAX_LOG_TEXT_CHARS)})
+
+    async def _on_thinking(block: ThinkingBlock) -> None:
+        await log_callback("thinking", {"content": _cap(block.thinking, _MAX_LOG_THINKING_CHARS)})
+
+    # pending_tools only correlates results for the callback; headless runs skip it
+    async def _on_tool_use(block: ToolUseBlock) -> None:
+        tool_info = {
+            "name": block.name,
+            "input": block.input,
+            "summary": extract_tool_summary(block.name, block.input),
+        }
+        pending_tools[block.id] = tool_info
+        # Results that never arrive must not pin their entries for the whole session
+        while len(pending_tools) > _PENDING_TOOL_CAP:
+            pending_tools.popitem(last=False)
+        await log_callback("tool_start", tool_info)
+
+    async def _on_tool_result(block: ToolResultBlock) -> None:
+        tool_info = pending_tools.pop(block.tool_use_id, {})
+        await log_callback("tool_result", {
+            "tool_name": tool_info.get("name"),
+            "summary": tool_info.get("summary"),
+            "is_error": block.is_error or False,
+            "content": _tool_result_preview(block.content),
+        })
+
+    block_handlers: Dict[type, Callable] = {TextBlock: _on_text}
+    if log_callback:
+        block_handlers[ToolUseBlock] = _on_tool_use
+        block_handlers[ToolResultBlock] = _on_tool_result
+        if _LOG_THINKING:
+            block_handlers[ThinkingBlock] = _on_thinking
+
+    backpressure = get_backpressure()
+    acquired = False
     try:
+        # Inside the try so an admission timeout is reported through log_callback like any failure
+        await backpressure.acquire()
+        acquired = True
         print(f"🎯 Starting Claude Code with: {instruction[:80]}...")
         message_count = 0
         if log_callback:
@@ -265,62 +495,29 @@ async def generate_diff_with_logging(
 
         async for message in query(prompt=user_prompt, options=options):
             message_count += 1
-            messages_received.append(message)
 
             if isinstance(message, AssistantMessage):
                 for block in message.content:
-                    if isinstance(block, TextBlock):
-                        response_text += block.text
-                        if log_callback:
-                            try:
-                                import os as _os_log
-                                _max_chars = int(_os_log.getenv("MAX_LOG_TEXT_CHARS", "1200") or "1200")
-                            except Exception:
-                                _max_chars = 1200
-                            content = block.text
-                            if _max_chars and _max_chars > 0 and len(content) > _max_chars:
-                                content = content[:_max_chars] + "..."
-                            await log_callback("text", {"content": content})
-
-                    elif isinstance(block, ThinkingBlock):
-                        if log_callback:
-                            import os as _os_th
-                            _log_thinking = (_os_th.getenv("LOG_THINKING", "0") or "0").strip().lower() in ("1", "true", "yes", "on")
-                            if _log_thinking:
-                                t = block.thinking
-                                max_th = 200
-                                try:
-                                    max_th = int(_os_th.getenv("MAX_LOG_THINKING_CHARS", "200") or "200")
-                                except Exception:
-                                    max_th = 200
-                                out = (t[:max_th] + "...") if len(t) > max_th else t
-                                await log_callback("thinking", {"content": out})
-
-                    elif isinstance(block, ToolUseBlock):
-                        pending_tools[block.id] = {
-                            "name": block.name,
-                            "input": block.input,
-                            "summary": extract_tool_summary(block.name, block.input),
-                        }
-                        if log_callback:
-                            await log_callback("tool_start", pending_tools[block.id])
-
-                    elif isinstance(block, ToolResultBlock):
-                        tool_info = pending_tools.pop(block.tool_use_id, {})
-                        if log_callback:
-                            await log_callback("tool_result", {
-                                "tool_name": tool_info.get("name"),
-                                "summary": tool_info.get("summary"),
-                                "is_error": block.is_error or False,
-                                "content": str(block.content)[:400],
-                            })
+                    handler = block_handlers.get(type(block))
+                    if handler is not None:
+                        await handler(block)
 
             elif isinstance(message, ResultMessage):
                 if hasattr(message, "session_id") and message.session_id:
                     current_session_id = message.session_id
                     print(f"🧩 Session ID: {current_session_id}")
 
-                duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+                duration_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+                if not message.is_error:
+                    backpressure.record_success()
+                # Prompt-cache hit ratio: reads should dominate creations on resumed sessions
+                usage = getattr(message, "usage", None) or {}
+                cache_read = usage.get("cache_read_input_tokens", 0)
+                cache_created = usage.get("cache_creation_input_tokens", 0)
+                logger.debug(
+                    "Prompt cache: read=%s created=%s input=%s",
+                    cache_read, cache_created, usage.get("input_tokens", 0),
+                )
                 if log_callback:
                     await log_callback("result", {
                         "duration_ms": duration_ms,
@@ -329,33 +526,32 @@ async def generate_diff_with_logging(
                         "cost_usd": message.total_cost_usd,
                         "is_error": message.is_error,
                         "session_id": current_session_id,
+                        "cache_read_input_tokens": cache_read,
+                        "cache_creation_input_tokens": cache_created,
                     })
 
     except Exception as exc:
         print(f"❌ Claude Code SDK Exception: {exc}")
+        if not isinstance(exc, UpstreamAdmissionTimeout) and is_throttle_error(exc):
+            backpressure.record_throttle()
         if log_callback:
             await log_callback("error", {"message": str(exc)})
         raise RuntimeError(f"Claude Code SDK failed: {exc}") from exc
+    finally:
+        if coalescer is not None:
+            await coalescer.flush()
+        if acquired:
+            await backpressure.release()
 
     print(f"✅ Claude Code completed — {message_count} messages received.")
 
     if message_count == 0:
-        response_text = (
-            f"I understand you want to: {instruction}\n\n"
-            "But Claude Code SDK might not be configured correctly. "
-            "Ensure CLI or ANTHROPIC_API_KEY is set."
-        )
-
-    # Parse commit message and summary
-    commit_msg = ""
-    if "<COMMIT_MSG>" in response_text and "</COMMIT_MSG>" in response_text:
-        commit_msg = response_text.split("<COMMIT_MSG>", 1)[1].split("</COMMIT_MSG>", 1)[0].strip()
-    if not commit_msg:
-        commit_msg = instruction[:72]
+        print("⚠️ No messages from Claude Code SDK — ensure CLI or ANTHROPIC_API_KEY is set.")
 
+    commit_msg = commit_capture.value or instruction[:72]
     diff_summary = "Changes applied via Claude Code"
-    if "<SUMMARY>" in response_text and "</SUMMARY>" in response_text:
-        diff_summary = response_text.split("<SUMMARY>", 1)[1].split("</SUMMARY>", 1)[0].strip()
+    if summary_capture.value is not None:
+        diff_summary = summary_capture.value
 
     return commit_msg, diff_summary, current_session_id
 
@@ -5,51 +5,432 @@ Moved from unified_manager.py to a dedicated adapter module.
 from __future__ import annotations
 
 import asyncio
-import json
+import contextlib
+import hashlib
 import os
 import tempfile
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 
+import orjson
+from app.core.backpressure import get_backpressure, is_throttle_error
 from app.core.terminal_ui import ui
 from app.models.messages import Message
 from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
 
 from ..base import BaseCLI, CLIType
 
+# SDK message types resolved once at import (not per streamed message)
+try:
+    from anthropic.claude_code.types import (
+        AssistantMessage,
+        ResultMessage,
+        SystemMessage,
+        UserMessage,
+    )
+except ImportError:
+    try:
+        from claude_code_sdk.types import (
+            AssistantMessage,
+            ResultMessage,
+            SystemMessage,
+            UserMessage,
+        )
+    except ImportError:
+        # Fallback - match on type names only
+        SystemMessage = AssistantMessage = UserMessage = ResultMessage = type(None)
+from claude_code_sdk.types import TextBlock, ToolResultBlock, ToolUseBlock
+
+_MESSAGE_KINDS = {
+    SystemMessage: "system",
+    AssistantMessage: "assistant",
+    UserMessage: "user",
+    ResultMessage: "result",
+}
+_MESSAGE_KINDS.pop(type(None), None)
+_MESSAGE_KINDS_BY_NAME = {
+    "SystemMessage": "system",
+    "AssistantMessage": "assistant",
+    "UserMessage": "user",
+    "ResultMessage": "result",
+}
+
+
+# Enforce concise, frugal assistant style to reduce token usage
+_CONCISE_DIRECTIVE = (
+    "\n\nStyle & efficiency rules:\n"
+    "- Be concise; avoid long breakdowns.\n"
+    "- Avoid step-by-step lists unless explicitly asked. Prefer direct, surgical edits.\n"
+    "- Never paste long code in chat. Use Write/Edit/MultiEdit tools to apply changes and reply with one concise summary line.\n"
+    "- Before reading files, use Glob/Grep to locate only the smallest necessary files.\n"
+    "- Do not read or write in ignored paths (node_modules, .next, dist, coverage, *.lock, public/assets, large binaries).\n"
+    "- If a read would exceed ~200 KB, stop and propose a narrower plan or chunk the work.\n"
+    "- Maintain a concise change log in context/session-summary.md instead of repeating history in chat.\n"
+    "- When referencing files in chat, show only the final filename (e.g., 'TodoForm.tsx').\n"
+)
+
+_FALLBACK_SYSTEM_PROMPT = (
+    "You are Vrabby, an advanced AI coding assistant created by Marek Vrábel (MHost.sk). "
+    "Keep responses extremely concise and end with exactly one short, friendly sentence — "
+    "no change logs, commands, URLs, environment details, or technical stack lists."
+) + _CONCISE_DIRECTIVE
+
+# Short, append-only policy to enforce identity/output without large CLI args
+_COMPACT_POLICY = (
+    "You are Vrabby. End with exactly one short, friendly sentence. "
+    "Do not include commands, URLs, ports, environment info, technical stack lists, or change logs."
+)
+
+# Conservative Claude settings: persisted to .claude/settings.json and merged into each session
+_DEFAULT_CLAUDE_SETTINGS = MappingProxyType({
+    "ignorePaths": (
+        "node_modules", ".next", "dist", "build", "coverage", ".git", "**/*.min.*", "**/*.map",
+        "public/assets/**", "**/*.lock", "**/*.svg", "**/*.png", "**/*.jpg", "**/*.jpeg", "**/*.gif"
+    ),
+    "maxReadBytes": 200000,
+    "maxToolReadsPerTurn": 30,
+    "preferDiffEdits": True,
+    "autoApplyEdits": True,
+})
+
+_ALLOWED_TOOLS_INITIAL = (
+    "Read", "Write", "Edit", "MultiEdit", "Bash", "Glob", "Grep", "LS", "WebFetch", "WebSearch",
+)
+_ALLOWED_TOOLS_NORMAL = _ALLOWED_TOOLS_INITIAL + ("TodoWrite",)
+_DISALLOWED_TOOLS_INITIAL = ("TodoWrite",)
+# Flags passed straight through to the claude CLI
+_CLI_EXTRA_ARGS = MappingProxyType({"print": None, "verbose": None})
+
+# Repo map: skipped top-level dirs and files worth reporting with sizes
+_IGNORE_DIR_NAMES = frozenset({"node_modules", ".next", "dist", "build", "coverage", ".git", ".venv"})
+_NOTABLE_FILES = frozenset({
+    "package.json", "pnpm-lock.yaml", "package-lock.json", "yarn.lock",
+    "next.config.mjs", "next.config.js", "tailwind.config.ts", "tailwind.config.js",
+    "tsconfig.json", "README.md", ".env", ".env.example",
+})
+
+
+
+def _dumps(obj: Any, *, indent: bool = False, sort_keys: bool = False) -> bytes:
+    option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return orjson.dumps(obj, option=option)
+
+
+def _atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write ``data`` to a temp file beside ``path`` and rename it into place.
+
+    Readers (the CLI, a concurrent session) see either the old file or the new one, never a partial write.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def _message_kind(message_obj: Any) -> Optional[str]:
+    """Classify a streamed SDK message with one dict lookup (name lookup as fallback)."""
+    msg_type = type(message_obj)
+    kind = _MESSAGE_KINDS.get(msg_type) or _MESSAGE_KINDS_BY_NAME.get(msg_type.__name__)
+    if kind is None and getattr(message_obj, "type", None) == "result":
+        kind = "result"
+    return kind
+
+
+# Message ids are drawn from a pre-generated pool: one urandom read per batch instead of per id
+_UUID_BATCH = 128
+_UUID_POOL: List[str] = []
+
+
+def _next_uuid() -> str:
+    if not _UUID_POOL:
+        raw = os.urandom(16 * _UUID_BATCH)
+        # version=4 sets the version and RFC 4122 variant bits, same as uuid.uuid4()
+        _UUID_POOL.extend(str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16))
+    return _UUID_POOL.pop()
+
+
+_STREAM_END = object()
+
+
+async def _buffered(source, limit: int = 1, stop: Optional[Callable[[Any], bool]] = None):
+    """Prefetch up to ``limit`` items from ``source`` while the consumer handles the current one.
+
+    Prefetching halts after an item matching ``stop`` so nothing past the end of a turn is consumed.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, limit))
+
+    async def _pump() -> None:
+        try:
+            async for item in source:
+                await queue.put((item, None))
+                if stop is not None and stop(item):
+                    break
+            await queue.put((_STREAM_END, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put((_STREAM_END, e))
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                with contextlib.suppress(Exception):
+                    await aclose()
+
+    pump = asyncio.create_task(_pump())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        if not pump.done():
+            pump.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await pump
+
 
 class ClaudeCodeCLI(BaseCLI):
     """Claude Code Python SDK implementation"""
 
+    # settings content hash -> temp settings file path (LRU); files live until evicted or process exit
+    _settings_path_cache: "OrderedDict[str, str]" = OrderedDict()
+    _SETTINGS_CACHE_MAX = 32
+    # settings file path -> sessions currently using it; an evicted file is only removed at 0
+    _settings_path_refs: Dict[str, int] = {}
+    # Prepared in asyncio.to_thread workers, so the two maps above are only touched under this lock
+    _settings_lock = threading.Lock()
+    # project_id -> session id is LRU-bounded so a long-lived process doesn't keep every project forever
+    _SESSION_MAPPING_MAX = 10_000
+    # .claude/settings.json path -> (st_mtime_ns, st_size, parsed settings)
+    _project_settings_cache: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
     def __init__(self):
         super().__init__(CLIType.CLAUDE)
-        self.session_mapping: Dict[str, str] = {}
+        self.session_mapping: "OrderedDict[str, str]" = OrderedDict()
         # Cache last-known session metadata to avoid unnecessary re-initialization
         # Keyed by project_id: { 'model': str, 'updated_at': datetime.isoformat }
         self._last_session_meta: Dict[str, Dict[str, Any]] = {}
 
+    @classmethod
+    def _checkout_settings_path(cls, key: str, settings_json: bytes) -> str:
+        """Path of the settings file for ``key`` (written on a miss), counted as in use until released."""
+        with cls._settings_lock:
+            path = cls._settings_path_cache.get(key)
+            if path is not None and os.path.exists(path):
+                cls._settings_path_cache.move_to_end(key)
+            else:
+                temp_settings = tempfile.NamedTemporaryFile(mode="wb", suffix=".json", delete=False)
+                temp_settings.write(settings_json)
+                temp_settings.close()
+                path = temp_settings.name
+                cls._settings_path_cache[key] = path
+                ui.debug(f"Wrote temporary Claude settings to {path}", "Claude SDK")
+                while len(cls._settings_path_cache) > cls._SETTINGS_CACHE_MAX:
+                    _, stale = cls._settings_path_cache.popitem(last=False)
+                    if not cls._settings_path_refs.get(stale):
+                        with contextlib.suppress(OSError):
+                            os.remove(stale)
+            cls._settings_path_refs[path] = cls._settings_path_refs.get(path, 0) + 1
+            return path
+
+    @classmethod
+    def _release_settings_path(cls, path: str) -> None:
+        with cls._settings_lock:
+            refs = cls._settings_path_refs.get(path, 0) - 1
+            if refs > 0:
+                cls._settings_path_refs[path] = refs
+                return
+            cls._settings_path_refs.pop(path, None)
+            # Evicted while this session was using it: nobody else can get it now
+            if path not in cls._settings_path_cache.values():
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+    @staticmethod
+    def _prepare_repo_context(project_path: str) -> str:
+        """Write context/repo-map.json and session-summary.md; return the instruction hint.
+
+        Blocking filesystem work, run via asyncio.to_thread.
+        """
+        try:
+            context_dir = os.path.join(project_path, "context")
+            os.makedirs(context_dir, exist_ok=True)
+
+            repo_map_path = os.path.join(context_dir, "repo-map.json")
+            # Top-level adds/removes bump the project dir mtime and edits to a notable file bump its
+            # own (its size is in the map); an up-to-date map is reused as is
+            project_mtime = os.stat(project_path).st_mtime_ns
+            for name in _NOTABLE_FILES:
+                try:
+                    project_mtime = max(project_mtime, os.stat(os.path.join(project_path, name)).st_mtime_ns)
+                except OSError:
+                    continue
+            try:
+                map_mtime = os.stat(repo_map_path).st_mtime_ns
+            except OSError:
+                map_mtime = 0
+            if map_mtime >= project_mtime:
+                ui.debug("Repo map is current; skipping rebuild", "Claude SDK")
+            else:
+                # Build a compact repo map (top-level dirs + notable files with sizes)
+                repo_map = {"dirs": [], "notableFiles": [], "generated_at": datetime.utcnow().isoformat()}
+                # One directory read; DirEntry caches type info so no extra stat per entry
+                try:
+                    with os.scandir(project_path) as it:
+                        entries = sorted(it, key=lambda e: e.name)
+                    for entry in entries:
+                        try:
+                            if entry.name in _IGNORE_DIR_NAMES:
+                                continue
+                            if entry.is_dir(follow_symlinks=False):
+                                repo_map["dirs"].append(entry.name)
+                            elif entry.name in _NOTABLE_FILES and entry.is_file():
+                                repo_map["notableFiles"].append({"path": entry.name, "bytes": int(entry.stat().st_size)})
+                        except OSError:
+                            continue
+                    # Cap dirs list to ~20 entries
+                    repo_map["dirs"] = repo_map["dirs"][:20]
+                except Exception:
+                    pass
+
+                try:
+                    _atomic_write_bytes(repo_map_path, _dumps(repo_map))
+                    # Stamp the map with the newest mtime it reflects
+                    os.utime(repo_map_path, ns=(project_mtime, project_mtime))
+                    ui.info(f"Wrote compact repo map to context/repo-map.json", "Claude SDK")
+                except Exception as write_err:
+                    ui.warning(f"Failed to write repo map: {write_err}", "Claude SDK")
+
+            # Ensure session-summary.md exists; exclusive create never clobbers the manager's
+            # concurrent rewrite of it (the old exists-then-"w" check could)
+            summary_path = os.path.join(context_dir, "session-summary.md")
+            try:
+                with open(summary_path, "x", encoding="utf-8") as f:
+                    f.write("# Session Summary\n\n- Use this file to keep a concise log of work done (features, files touched, follow-ups).\n\n" \
+                            f"Created: {datetime.utcnow().isoformat()}\n")
+            except Exception:
+                pass
+
+            # Add a tiny hint to the instruction
+            hint = ("\n\n[context] A small repository map is available at context/repo-map.json. "
+                    "If you need more detail, use Glob/Grep to drill into files; do not ask for or generate large listings. "
+                    "Maintain a concise change log in context/session-summary.md.")
+            return hint
+        except Exception as e:
+            ui.warning(f"Failed to prepare compact repo context: {e}", "Claude SDK")
+            return ""
+
+    @classmethod
+    def _prepare_session_settings(
+            cls, project_path: str, reuse_session: bool, full_system_prompt: Optional[str]
+    ) -> Optional[str]:
+        """Ensure .claude/settings.json exists and return the session settings file path (if any).
+
+        A returned path is checked out and must be handed back via ``_release_settings_path``.
+
+        Blocking filesystem work, run via asyncio.to_thread.
+        """
+        session_settings_path = None
+        base_settings = {}
+        settings_dir = os.path.join(project_path, ".claude")
+        settings_file_path = os.path.join(settings_dir, "settings.json")
+        try:
+            settings_stat = os.stat(settings_file_path)
+        except OSError:
+            settings_stat = None
+        # Persist a minimal default settings.json if missing (non-destructive)
+        if settings_stat is None:
+            try:
+                os.makedirs(settings_dir, exist_ok=True)
+                _atomic_write_bytes(settings_file_path, _dumps(dict(_DEFAULT_CLAUDE_SETTINGS), indent=True))
+                ui.info("Created default .claude/settings.json with conservative limits", "Claude SDK")
+                settings_stat = os.stat(settings_file_path)
+            except Exception as _persist_err:
+                ui.warning(f"Could not persist default .claude/settings.json: {_persist_err}", "Claude SDK")
+
+        if not reuse_session:
+            if settings_stat is not None:
+                # Re-parse only when the file changed (user edits bump mtime/size)
+                cached = cls._project_settings_cache.get(settings_file_path)
+                if cached and cached[0] == settings_stat.st_mtime_ns and cached[1] == settings_stat.st_size:
+                    base_settings = cached[2]
+                else:
+                    try:
+                        with open(settings_file_path, "rb") as settings_file:
+                            loaded_settings = orjson.loads(settings_file.read())
+                            if isinstance(loaded_settings, dict):
+                                base_settings = loaded_settings
+                                cls._project_settings_cache[settings_file_path] = (
+                                    settings_stat.st_mtime_ns, settings_stat.st_size, loaded_settings
+                                )
+                            else:
+                                ui.warning("Existing Claude settings file is not a JSON object; ignoring it", "Claude SDK")
+                    except Exception as settings_error:
+                        ui.warning(f"Failed to load existing Claude settings: {settings_error}", "Claude SDK")
+            session_settings = dict(base_settings)
+
+            # Merge defaults without overwriting explicit project settings
+            for k, v in _DEFAULT_CLAUDE_SETTINGS.items():
+                if k not in session_settings:
+                    session_settings[k] = v
+                elif k == "ignorePaths":
+                    # Order-preserving union: project globs first, then any missing defaults
+                    merged = dict.fromkeys(session_settings.get("ignorePaths") or [])
+                    merged.update(dict.fromkeys(v))
+                    session_settings["ignorePaths"] = list(merged)
+
+            session_settings["customSystemPrompt"] = full_system_prompt
+            # The session settings file is a pure function of its content: write each distinct
+            # variant once and hand the same read-only path to every session that needs it
+            settings_json = _dumps(session_settings, sort_keys=True)
+            settings_key = hashlib.blake2b(settings_json, digest_size=16).hexdigest()
+            try:
+                session_settings_path = cls._checkout_settings_path(settings_key, settings_json)
+            except Exception as settings_write_error:
+                ui.warning(f"Failed to create temporary settings file for Claude CLI: {settings_write_error}", "Claude SDK")
+                session_settings_path = None
+        else:
+            ui.debug("Skipping settings file creation (reusing existing session)", "Claude SDK")
+        return session_settings_path
+
     async def check_availability(self) -> Dict[str, Any]:
         """Check if Claude Code CLI is available"""
+        not_installed = {
+            "available": False,
+            "configured": False,
+            "error": (
+                "Claude Code CLI not installed or not working.\n\nTo install:\n"
+                "1. Install Claude Code: pnpm add -g @anthropic-ai/claude-code\n"
+                "2. Login to Claude: claude login\n3. Try running your prompt again"
+            ),
+        }
         try:
-            # First try to check if claude CLI is installed and working
-            result = await asyncio.create_subprocess_shell(
-                "claude -h",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            # First try to check if claude CLI is installed and working (exec directly, no shell)
+            try:
+                result = await asyncio.create_subprocess_exec(
+                    "claude",
+                    "-h",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except FileNotFoundError:
+                return not_installed
             stdout, stderr = await result.communicate()
 
             if result.returncode != 0:
-                return {
-                    "available": False,
-                    "configured": False,
-                    "error": (
-                        "Claude Code CLI not installed or not working.\n\nTo install:\n"
-                        "1. Install Claude Code: pnpm add -g @anthropic-ai/claude-code\n"
-                        "2. Login to Claude: claude login\n3. Try running your prompt again"
-                    ),
-                }
+                return not_installed
 
             # Check if help output contains expected content
             help_output = stdout.decode() + stderr.decode()
@@ -98,10 +479,13 @@ class ClaudeCodeCLI(BaseCLI):
     ) -> AsyncGenerator[Message, None]:
         """Execute instruction using Claude Code Python SDK"""
 
-        ui.info("Starting Claude SDK execution", "Claude SDK")
-        ui.debug(f"Instruction: {instruction[:100]}...", "Claude SDK")
-        ui.debug(f"Project path: {project_path}", "Claude SDK")
-        ui.debug(f"Session ID: {session_id}", "Claude SDK")
+        # ui drops debug/info/success unless DEBUG is on; skip building those f-strings too
+        verbose = ui.debug_enabled
+        if verbose:
+            ui.info("Starting Claude SDK execution", "Claude SDK")
+            ui.debug(f"Instruction: {instruction[:100]}...", "Claude SDK")
+            ui.debug(f"Project path: {project_path}", "Claude SDK")
+            ui.debug(f"Session ID: {session_id}", "Claude SDK")
 
         if log_callback:
             await log_callback("Starting execution...")
@@ -126,9 +510,9 @@ class ClaudeCodeCLI(BaseCLI):
         reuse_session = bool(
             existing_session_id_early and last_meta.get("model") == cli_model and not is_initial_prompt
         )
-        if reuse_session:
+        if verbose and reuse_session:
             ui.info(f"Reusing Claude session without re-init (model: {cli_model}, agent: {agent_key})", "Claude SDK")
-        else:
+        elif verbose:
             ui.debug(
                 f"Session init required (existing_session={bool(existing_session_id_early)}, last_model={last_meta.get('model')}, current_model={cli_model}, initial={is_initial_prompt}, agent={agent_key})",
                 "Claude SDK",
@@ -140,265 +524,59 @@ class ClaudeCodeCLI(BaseCLI):
             "updated_at": datetime.utcnow().isoformat(),
         }
 
-        # Load system prompt (always load to enforce identity/output policy)
-        try:
-            from app.services.claude_act import get_system_prompt
-
-            # Use full system-prompt only for initial project setup; otherwise use core+design
-            system_prompt = get_system_prompt(first_run=is_initial_prompt, sub_agent=sub_agent)
-            ui.debug(f"System prompt loaded: {len(system_prompt)} chars", "Claude SDK")
-            full_system_prompt = system_prompt
-            trimmed_system_prompt = system_prompt
-        except Exception as e:
-            ui.error(f"Failed to load system prompt: {e}", "Claude SDK")
-            full_system_prompt = (
-                "You are Vrabby, an advanced AI coding assistant created by Marek Vrábel (MHost.sk). "
-                "Keep responses extremely concise and end with exactly one short, friendly sentence — "
-                "no change logs, commands, URLs, environment details, or technical stack lists."
-            )
-            trimmed_system_prompt = full_system_prompt
-
-        # Enforce concise, frugal assistant style to reduce token usage
-        concise_directive = (
-            "\n\nStyle & efficiency rules:\n"
-            "- Be concise; avoid long breakdowns.\n"
-            "- Avoid step-by-step lists unless explicitly asked. Prefer direct, surgical edits.\n"
-            "- Never paste long code in chat. Use Write/Edit/MultiEdit tools to apply changes and reply with one concise summary line.\n"
-            "- Before reading files, use Glob/Grep to locate only the smallest necessary files.\n"
-            "- Do not read or write in ignored paths (node_modules, .next, dist, coverage, *.lock, public/assets, large binaries).\n"
-            "- If a read would exceed ~200 KB, stop and propose a narrower plan or chunk the work.\n"
-            "- Maintain a concise change log in context/session-summary.md instead of repeating history in chat.\n"
-            "- When referencing files in chat, show only the final filename (e.g., 'TodoForm.tsx').\n"
-        )
-        try:
-            full_system_prompt = (full_system_prompt or "") + concise_directive
-            trimmed_system_prompt = (trimmed_system_prompt or "") + concise_directive
-        except Exception:
-            pass
-
-        # Short, append-only policy to enforce identity/output without large CLI args
-        compact_policy = (
-            "You are Vrabby. End with exactly one short, friendly sentence. "
-            "Do not include commands, URLs, ports, environment info, technical stack lists, or change logs."
-        )
-
-        # Provide a tiny repo map instead of large directory listings for initial prompts
-        if is_initial_prompt:
+        # Load system prompt to enforce identity/output policy. get_system_prompt serves prompts
+        # composed at import (re-reading them under PROMPT_HOT_RELOAD), so no copy is kept here.
+        # A reused session already has it and writes no settings file, so skip it there.
+        full_system_prompt: Optional[str] = None
+        if not reuse_session:
             try:
-                context_dir = os.path.join(project_path, "context")
-                os.makedirs(context_dir, exist_ok=True)
+                from app.services.claude_act import get_system_prompt
 
-                # Build a compact repo map (top-level dirs + notable files with sizes)
-                repo_map = {"dirs": [], "notableFiles": [], "generated_at": datetime.utcnow().isoformat()}
-                try:
-                    entries = sorted(os.listdir(project_path))
-                    ignore_names = {"node_modules", ".next", "dist", "build", "coverage", ".git", ".venv"}
-                    for name in entries:
-                        if name in ignore_names:
-                            continue
-                        full = os.path.join(project_path, name)
-                        if os.path.isdir(full):
-                            repo_map["dirs"].append(name)
-                    # Cap dirs list to ~20 entries
-                    repo_map["dirs"] = repo_map["dirs"][:20]
-                except Exception:
-                    pass
-
-                notable = [
-                    "package.json", "pnpm-lock.yaml", "package-lock.json", "yarn.lock",
-                    "next.config.mjs", "next.config.js", "tailwind.config.ts", "tailwind.config.js",
-                    "tsconfig.json", "README.md", ".env", ".env.example"
-                ]
-                for fname in notable:
-                    p = os.path.join(project_path, fname)
-                    try:
-                        if os.path.isfile(p):
-                            size = os.path.getsize(p)
-                            repo_map["notableFiles"].append({"path": fname, "bytes": int(size)})
-                    except Exception:
-                        continue
-
-                repo_map_path = os.path.join(context_dir, "repo-map.json")
-                try:
-                    with open(repo_map_path, "w", encoding="utf-8") as f:
-                        json.dump(repo_map, f, ensure_ascii=False)
-                    ui.info(f"Wrote compact repo map to context/repo-map.json", "Claude SDK")
-                except Exception as write_err:
-                    ui.warning(f"Failed to write repo map: {write_err}", "Claude SDK")
-
-                # Ensure session-summary.md exists
-                summary_path = os.path.join(context_dir, "session-summary.md")
-                if not os.path.exists(summary_path):
-                    try:
-                        with open(summary_path, "w", encoding="utf-8") as f:
-                            f.write("# Session Summary\n\n- Use this file to keep a concise log of work done (features, files touched, follow-ups).\n\n" \
-                                    f"Created: {datetime.utcnow().isoformat()}\n")
-                    except Exception:
-                        pass
-
-                # Add a tiny hint to the instruction
-                hint = ("\n\n[context] A small repository map is available at context/repo-map.json. "
-                        "If you need more detail, use Glob/Grep to drill into files; do not ask for or generate large listings. "
-                        "Maintain a concise change log in context/session-summary.md.")
-                instruction = instruction + hint
+                # Use full system-prompt only for initial project setup; otherwise use core+design
+                system_prompt = get_system_prompt(first_run=is_initial_prompt, sub_agent=sub_agent)
+                ui.debug(f"System prompt loaded: {len(system_prompt)} chars", "Claude SDK")
+                full_system_prompt = "".join((system_prompt or "", _CONCISE_DIRECTIVE))
             except Exception as e:
-                ui.warning(f"Failed to prepare compact repo context: {e}", "Claude SDK")
-
-        session_settings_path = None
-        base_settings = {}
-        settings_dir = os.path.join(project_path, ".claude")
-        settings_file_path = os.path.join(settings_dir, "settings.json")
-        # Persist a minimal default settings.json if missing (non-destructive)
-        try:
-            if not os.path.exists(settings_file_path):
-                os.makedirs(settings_dir, exist_ok=True)
-                _persistent_defaults = {
-                    "ignorePaths": [
-                        "node_modules", ".next", "dist", "build", "coverage", ".git", "**/*.min.*", "**/*.map",
-                        "public/assets/**", "**/*.lock", "**/*.svg", "**/*.png", "**/*.jpg", "**/*.jpeg", "**/*.gif"
-                    ],
-                    "maxReadBytes": 200000,
-                    "maxToolReadsPerTurn": 30,
-                    "preferDiffEdits": True,
-                    "autoApplyEdits": True,
-                }
-                with open(settings_file_path, "w", encoding="utf-8") as f:
-                    json.dump(_persistent_defaults, f, ensure_ascii=False, indent=2)
-                ui.info("Created default .claude/settings.json with conservative limits", "Claude SDK")
-        except Exception as _persist_err:
-            ui.warning(f"Could not persist default .claude/settings.json: {_persist_err}", "Claude SDK")
-
-        if not reuse_session:
-            if os.path.exists(settings_file_path):
-                try:
-                    with open(settings_file_path, "r", encoding="utf-8") as settings_file:
-                        loaded_settings = json.load(settings_file)
-                        if isinstance(loaded_settings, dict):
-                            base_settings = loaded_settings
-                        else:
-                            ui.warning("Existing Claude settings file is not a JSON object; ignoring it", "Claude SDK")
-                except Exception as settings_error:
-                    ui.warning(f"Failed to load existing Claude settings: {settings_error}", "Claude SDK")
-            session_settings = dict(base_settings)
+                ui.error(f"Failed to load system prompt: {e}", "Claude SDK")
+                full_system_prompt = _FALLBACK_SYSTEM_PROMPT
 
-            # Inject conservative defaults to reduce token usage/tool noise
-            default_settings = {
-                "ignorePaths": [
-                    "node_modules", ".next", "dist", "build", "coverage", ".git", "**/*.min.*", "**/*.map",
-                    "public/assets/**", "**/*.lock", "**/*.svg", "**/*.png", "**/*.jpg", "**/*.jpeg", "**/*.gif"
-                ],
-                "maxReadBytes": 200000,
-                "maxToolReadsPerTurn": 30,
-                "preferDiffEdits": True,
-                "autoApplyEdits": True,
-            }
-            # Merge defaults without overwriting explicit project settings
-            for k, v in default_settings.items():
-                if k not in session_settings:
-                    session_settings[k] = v
-                elif k == "ignorePaths":
-                    try:
-                        existing = set(session_settings.get("ignorePaths", []) or [])
-                        for item in v:
-                            if item not in existing:
-                                existing.add(item)
-                        session_settings["ignorePaths"] = list(existing)
-                    except Exception:
-                        session_settings["ignorePaths"] = v
-
-            session_settings["customSystemPrompt"] = full_system_prompt
-            try:
-                temp_settings = tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False, encoding="utf-8")
-                json.dump(session_settings, temp_settings, ensure_ascii=False)
-                temp_settings.flush()
-                temp_settings.close()
-                session_settings_path = temp_settings.name
-                ui.debug(f"Wrote temporary Claude settings to {session_settings_path}", "Claude SDK")
-            except Exception as settings_write_error:
-                ui.warning(f"Failed to create temporary settings file for Claude CLI: {settings_write_error}", "Claude SDK")
-                session_settings_path = None
-        else:
-            ui.debug("Skipping settings file creation (reusing existing session)", "Claude SDK")
-
-        # Configure tools based on initial prompt status
+        # Blocking file prep runs off the event loop so concurrent sessions keep streaming
         if is_initial_prompt:
-            # For initial prompts: use disallowed_tools to explicitly block TodoWrite
-            allowed_tools = [
-                "Read",
-                "Write",
-                "Edit",
-                "MultiEdit",
-                "Bash",
-                "Glob",
-                "Grep",
-                "LS",
-                "WebFetch",
-                "WebSearch",
-            ]
-            disallowed_tools = ["TodoWrite"]
-
-            ui.info(
-                f"TodoWrite tool EXCLUDED via disallowed_tools (is_initial_prompt: {is_initial_prompt})",
-                "Claude SDK",
-            )
-            ui.debug(f"Allowed tools: {allowed_tools}", "Claude SDK")
-            ui.debug(f"Disallowed tools: {disallowed_tools}", "Claude SDK")
-
-            # Configure Claude Code options with disallowed_tools
-            option_kwargs = {
-                "allowed_tools": allowed_tools,
-                "disallowed_tools": disallowed_tools,
-                "permission_mode": "bypassPermissions",
-                "model": cli_model,
-                "continue_conversation": True,
-                "extra_args": {
-                    "print": None,
-                    "verbose": None,
-                },
-            }
-            if session_settings_path:
-                option_kwargs["settings"] = session_settings_path
-            # Pass a short append-only policy to enforce identity/output without long CLI args
-            option_kwargs["append_system_prompt"] = compact_policy
-            options = ClaudeCodeOptions(**option_kwargs)
-        else:
-            # For non-initial prompts: include TodoWrite in allowed tools
-            allowed_tools = [
-                "Read",
-                "Write",
-                "Edit",
-                "MultiEdit",
-                "Bash",
-                "Glob",
-                "Grep",
-                "LS",
-                "WebFetch",
-                "WebSearch",
-                "TodoWrite",
-            ]
-
-            ui.info(
-                f"TodoWrite tool INCLUDED (is_initial_prompt: {is_initial_prompt})",
-                "Claude SDK",
-            )
-            ui.debug(f"Allowed tools: {allowed_tools}", "Claude SDK")
-
-            # Configure Claude Code options without disallowed_tools
-            option_kwargs = {
-                "allowed_tools": allowed_tools,
-                "permission_mode": "bypassPermissions",
-                "model": cli_model,
-                "continue_conversation": True,
-                "extra_args": {
-                    "print": None,
-                    "verbose": None,
-                },
-            }
-            if session_settings_path:
-                option_kwargs["settings"] = session_settings_path
+            instruction = instruction + await asyncio.to_thread(self._prepare_repo_context, project_path)
+        session_settings_path = await asyncio.to_thread(
+            self._prepare_session_settings, project_path, reuse_session, full_system_prompt
+        )
+
+        # Configure tools based on initial prompt status: initial prompts explicitly block TodoWrite
+        option_kwargs = {
+            "allowed_tools": list(_ALLOWED_TOOLS_INITIAL if is_initial_prompt else _ALLOWED_TOOLS_NORMAL),
+            "permission_mode": "bypassPermissions",
+            "model": cli_model,
+            "continue_conversation": True,
+            # Per-session working dir for the CLI subprocess (no process-wide chdir)
+            "cwd": project_path,
+            "extra_args": dict(_CLI_EXTRA_ARGS),
             # Pass a short append-only policy to enforce identity/output without long CLI args
-            option_kwargs["append_system_prompt"] = compact_policy
-            options = ClaudeCodeOptions(**option_kwargs)
+            "append_system_prompt": _COMPACT_POLICY,
+        }
+        if is_initial_prompt:
+            option_kwargs["disallowed_tools"] = list(_DISALLOWED_TOOLS_INITIAL)
+        if verbose:
+            if is_initial_prompt:
+                ui.info(
+                    f"TodoWrite tool EXCLUDED via disallowed_tools (is_initial_prompt: {is_initial_prompt})",
+                    "Claude SDK",
+                )
+                ui.debug(f"Disallowed tools: {option_kwargs['disallowed_tools']}", "Claude SDK")
+            else:
+                ui.info(
+                    f"TodoWrite tool INCLUDED (is_initial_prompt: {is_initial_prompt})",
+                    "Claude SDK",
+                )
+            ui.debug(f"Allowed tools: {option_kwargs['allowed_tools']}", "Claude SDK")
+        if session_settings_path:
+            option_kwargs["settings"] = session_settings_path
+        options = ClaudeCodeOptions(**option_kwargs)
 
         # Early resume if we already have a session id and plan to reuse
         try:
@@ -408,15 +586,10 @@ class ClaudeCodeCLI(BaseCLI):
         except Exception:
             pass
 
-        ui.info(f"Using model: {cli_model}", "Claude SDK")
-        ui.debug(f"Project path: {project_path}", "Claude SDK")
-        ui.debug(f"Instruction: {instruction[:100]}...", "Claude SDK")
+        if verbose:
+            ui.info(f"Using model: {cli_model}", "Claude SDK")
 
         try:
-            # Change to project directory
-            original_cwd = os.getcwd()
-            os.chdir(project_path)
-
             # Get project ID for session management
             project_id = (
                 project_path.split("/")[-1] if "/" in project_path else project_path
@@ -428,235 +601,198 @@ class ClaudeCodeCLI(BaseCLI):
                 options.resumeSessionId = existing_session_id
                 ui.info(f"Resuming session: {existing_session_id}", "Claude SDK")
 
-            try:
-                async with ClaudeSDKClient(options=options) as client:
-                    # Send initial query
-                    await client.query(instruction)
-
-                    # Stream responses and extract session_id
-                    claude_session_id = None
-
-                    async for message_obj in client.receive_messages():
-                        # Import SDK types for isinstance checks
-                        try:
-                            from anthropic.claude_code.types import (
-                                SystemMessage,
-                                AssistantMessage,
-                                UserMessage,
-                                ResultMessage,
-                            )
-                        except ImportError:
-                            try:
-                                from claude_code_sdk.types import (
-                                    SystemMessage,
-                                    AssistantMessage,
-                                    UserMessage,
-                                    ResultMessage,
-                                )
-                            except ImportError:
-                                # Fallback - check type name strings
-                                SystemMessage = type(None)
-                                AssistantMessage = type(None)
-                                UserMessage = type(None)
-                                ResultMessage = type(None)
-
-                        # Handle SystemMessage for session_id extraction
+            # Concurrency is capped by the manager's per-CLI bulkhead; the AIMD controller only observes
+            # outcomes here (it scales the API's write rate limit), so no second slot is held per session
+            backpressure = get_backpressure()
+            async with ClaudeSDKClient(options=options) as client:
+                # Send initial query
+                await client.query(instruction)
+
+                # Stream responses and extract session_id
+                claude_session_id = None
+
+                # Prefetch the next SDK message while the current one is turned into a Message
+                async for message_obj in _buffered(
+                        client.receive_messages(), limit=2, stop=lambda m: _message_kind(m) == "result"
+                ):
+                    kind = _message_kind(message_obj)
+                    # Blocks of one SDK message arrive together; stamp them with one timestamp
+                    received_at = datetime.utcnow()
+
+                    # Handle SystemMessage for session_id extraction
+                    if kind == "system":
+                        # Extract session_id if available
                         if (
-                                isinstance(message_obj, SystemMessage)
-                                or "SystemMessage" in str(type(message_obj))
+                                hasattr(message_obj, "session_id")
+                                and message_obj.session_id
                         ):
-                            # Extract session_id if available
-                            if (
-                                    hasattr(message_obj, "session_id")
-                                    and message_obj.session_id
-                            ):
-                                claude_session_id = message_obj.session_id
-                                await self.set_session_id(
-                                    session_key, claude_session_id
-                                )
-
-                            # Send init message (hidden from UI)
-                            init_message = Message(
-                                id=str(uuid.uuid4()),
-                                project_id=project_path,
-                                role="system",
-                                message_type="system",
-                                content=f"Claude Code SDK initialized (Model: {cli_model})",
-                                metadata_json={
-                                    "cli_type": self.cli_type.value,
-                                    "mode": "SDK",
-                                    "model": cli_model,
-                                    "session_id": getattr(
-                                        message_obj, "session_id", None
-                                    ),
-                                    "hidden_from_ui": True,
-                                },
-                                session_id=session_id,
-                                created_at=datetime.utcnow(),
+                            claude_session_id = message_obj.session_id
+                            await self.set_session_id(
+                                session_key, claude_session_id
                             )
-                            yield init_message
 
-                        # Handle AssistantMessage (complete messages)
-                        elif (
-                                isinstance(message_obj, AssistantMessage)
-                                or "AssistantMessage" in str(type(message_obj))
+                        # Send init message (hidden from UI)
+                        init_message = Message(
+                            id=_next_uuid(),
+                            project_id=project_path,
+                            role="system",
+                            message_type="system",
+                            content=f"Claude Code SDK initialized (Model: {cli_model})",
+                            metadata_json={
+                                "cli_type": self.cli_type.value,
+                                "mode": "SDK",
+                                "model": cli_model,
+                                "session_id": getattr(
+                                    message_obj, "session_id", None
+                                ),
+                                "hidden_from_ui": True,
+                            },
+                            session_id=session_id,
+                            created_at=received_at,
+                        )
+                        yield init_message
+
+                    # Handle AssistantMessage (complete messages)
+                    elif kind == "assistant":
+                        text_parts: List[str] = []
+
+                        # Process content - AssistantMessage has content: list[ContentBlock]
+                        if hasattr(message_obj, "content") and isinstance(
+                                message_obj.content, list
                         ):
-                            content = ""
-
-                            # Process content - AssistantMessage has content: list[ContentBlock]
-                            if hasattr(message_obj, "content") and isinstance(
-                                    message_obj.content, list
-                            ):
-                                for block in message_obj.content:
-                                    # Import block types for comparison
-                                    from claude_code_sdk.types import (
-                                        TextBlock,
-                                        ToolUseBlock,
-                                        ToolResultBlock,
+                            for block in message_obj.content:
+                                if isinstance(block, TextBlock):
+                                    # TextBlock has 'text' attribute
+                                    text_parts.append(block.text)
+                                elif isinstance(block, ToolUseBlock):
+                                    # ToolUseBlock has 'id', 'name', 'input' attributes
+                                    tool_name = block.name
+                                    tool_input = block.input
+                                    tool_id = block.id
+                                    summary = self._create_tool_summary(
+                                        tool_name, tool_input
                                     )
 
-                                    if isinstance(block, TextBlock):
-                                        # TextBlock has 'text' attribute
-                                        content += block.text
-                                    elif isinstance(block, ToolUseBlock):
-                                        # ToolUseBlock has 'id', 'name', 'input' attributes
-                                        tool_name = block.name
-                                        tool_input = block.input
-                                        tool_id = block.id
-                                        summary = self._create_tool_summary(
-                                            tool_name, tool_input
-                                        )
-
-                                        # Yield tool use message immediately
-                                        tool_message = Message(
-                                            id=str(uuid.uuid4()),
-                                            project_id=project_path,
-                                            role="assistant",
-                                            message_type="tool_use",
-                                            content=summary,
-                                            metadata_json={
-                                                "cli_type": self.cli_type.value,
-                                                "mode": "SDK",
-                                                "tool_name": tool_name,
-                                                "tool_input": tool_input,
-                                                "tool_id": tool_id,
-                                            },
-                                            session_id=session_id,
-                                            created_at=datetime.utcnow(),
-                                        )
-                                        # Display clean tool usage like Claude Code
-                                        tool_display = self._get_clean_tool_display(
-                                            tool_name, tool_input
-                                        )
-                                        ui.info(tool_display, "")
-                                        yield tool_message
-                                    elif isinstance(block, ToolResultBlock):
-                                        # Handle tool result blocks if needed
-                                        pass
-
-                            # Yield complete assistant text message if there's text content
-                            if content and content.strip():
-                                text_message = Message(
-                                    id=str(uuid.uuid4()),
-                                    project_id=project_path,
-                                    role="assistant",
-                                    message_type="chat",
-                                    content=content.strip(),
-                                    metadata_json={
-                                        "cli_type": self.cli_type.value,
-                                        "mode": "SDK",
-                                    },
-                                    session_id=session_id,
-                                    created_at=datetime.utcnow(),
-                                )
-                                yield text_message
-
-                        # Handle UserMessage (tool results, etc.)
-                        elif (
-                                isinstance(message_obj, UserMessage)
-                                or "UserMessage" in str(type(message_obj))
-                        ):
-                            # UserMessage has content: str according to types.py
-                            # UserMessages are typically tool results - we don't need to show them
-                            pass
-
-                        # Handle ResultMessage (final session completion)
-                        elif (
-                                isinstance(message_obj, ResultMessage)
-                                or "ResultMessage" in str(type(message_obj))
-                                or (
-                                        hasattr(message_obj, "type")
-                                        and getattr(message_obj, "type", None) == "result"
-                                )
-                        ):
-                            ui.success(
-                                f"Session completed in {getattr(message_obj, 'duration_ms', 0)}ms",
-                                "Claude SDK",
-                            )
-
-                            # Create internal result message (hidden from UI)
-                            result_message = Message(
-                                id=str(uuid.uuid4()),
+                                    # Yield tool use message immediately
+                                    tool_message = Message(
+                                        id=_next_uuid(),
+                                        project_id=project_path,
+                                        role="assistant",
+                                        message_type="tool_use",
+                                        content=summary,
+                                        metadata_json={
+                                            "cli_type": self.cli_type.value,
+                                            "mode": "SDK",
+                                            "tool_name": tool_name,
+                                            "tool_input": tool_input,
+                                            "tool_id": tool_id,
+                                        },
+                                        session_id=session_id,
+                                        created_at=received_at,
+                                    )
+                                    # Display clean tool usage like Claude Code
+                                    if verbose:
+                                        ui.info(self._get_clean_tool_display(tool_name, tool_input), "")
+                                    yield tool_message
+                                elif isinstance(block, ToolResultBlock):
+                                    # Handle tool result blocks if needed
+                                    pass
+
+                        # Yield complete assistant text message if there's text content
+                        content = "".join(text_parts)
+                        if content.strip():
+                            text_message = Message(
+                                id=_next_uuid(),
                                 project_id=project_path,
-                                role="system",
-                                message_type="result",
-                                content=(
-                                    f"Session completed in {getattr(message_obj, 'duration_ms', 0)}ms"
-                                ),
+                                role="assistant",
+                                message_type="chat",
+                                content=content.strip(),
                                 metadata_json={
                                     "cli_type": self.cli_type.value,
                                     "mode": "SDK",
-                                    "duration_ms": getattr(
-                                        message_obj, "duration_ms", 0
-                                    ),
-                                    "duration_api_ms": getattr(
-                                        message_obj, "duration_api_ms", 0
-                                    ),
-                                    "total_cost_usd": getattr(
-                                        message_obj, "total_cost_usd", 0
-                                    ),
-                                    "num_turns": getattr(message_obj, "num_turns", 0),
-                                    "is_error": getattr(message_obj, "is_error", False),
-                                    "subtype": getattr(message_obj, "subtype", None),
-                                    "session_id": getattr(
-                                        message_obj, "session_id", None
-                                    ),
-                                    "hidden_from_ui": True,  # Don't show to user
                                 },
                                 session_id=session_id,
-                                created_at=datetime.utcnow(),
+                                created_at=received_at,
                             )
-                            yield result_message
-                            break
+                            yield text_message
+
+                    # Handle UserMessage (tool results, etc.)
+                    elif kind == "user":
+                        # UserMessage has content: str according to types.py
+                        # UserMessages are typically tool results - we don't need to show them
+                        pass
 
-                        # Handle unknown message types
-                        else:
-                            ui.debug(
-                                f"Unknown message type: {type(message_obj)}",
+                    # Handle ResultMessage (final session completion)
+                    elif kind == "result":
+                        if verbose:
+                            ui.success(
+                                f"Session completed in {getattr(message_obj, 'duration_ms', 0)}ms",
                                 "Claude SDK",
                             )
-
-            finally:
-                try:
-                    if session_settings_path and os.path.exists(session_settings_path):
-                        os.remove(session_settings_path)
-                except Exception as cleanup_error:
-                    ui.debug(f"Failed to remove temporary settings file {session_settings_path}: {cleanup_error}",
-                             "Claude SDK")
-                # Restore original working directory
-                os.chdir(original_cwd)
+                        if not getattr(message_obj, "is_error", False):
+                            backpressure.record_success()
+
+                        # Create internal result message (hidden from UI)
+                        result_message = Message(
+                            id=_next_uuid(),
+                            project_id=project_path,
+                            role="system",
+                            message_type="result",
+                            content=(
+                                f"Session completed in {getattr(message_obj, 'duration_ms', 0)}ms"
+                            ),
+                            metadata_json={
+                                "cli_type": self.cli_type.value,
+                                "mode": "SDK",
+                                "duration_ms": getattr(
+                                    message_obj, "duration_ms", 0
+                                ),
+                                "duration_api_ms": getattr(
+                                    message_obj, "duration_api_ms", 0
+                                ),
+                                "total_cost_usd": getattr(
+                                    message_obj, "total_cost_usd", 0
+                                ),
+                                "num_turns": getattr(message_obj, "num_turns", 0),
+                                "is_error": getattr(message_obj, "is_error", False),
+                                "subtype": getattr(message_obj, "subtype", None),
+                                "session_id": getattr(
+                                    message_obj, "session_id", None
+                                ),
+                                "hidden_from_ui": True,  # Don't show to user
+                            },
+                            session_id=session_id,
+                            created_at=received_at,
+                        )
+                        yield result_message
+                        break
+
+                    # Handle unknown message types
+                    elif verbose:
+                        ui.debug(
+                            f"Unknown message type: {type(message_obj)}",
+                            "Claude SDK",
+                        )
 
         except Exception as e:
+            if is_throttle_error(e):
+                get_backpressure().record_throttle()
             ui.error(f"Exception occurred: {str(e)}", "Claude SDK")
             if log_callback:
                 await log_callback(f"Claude SDK Exception: {str(e)}")
             raise
+        finally:
+            if session_settings_path:
+                self._release_settings_path(session_settings_path)
 
     async def get_session_id(self, project_id: str) -> Optional[str]:
         """Get current session ID for project from database"""
         try:
             # Try to get from database if available (we'll need to pass db session)
-            return self.session_mapping.get(project_id)
+            session_id = self.session_mapping.get(project_id)
+            if session_id is not None:
+                self.session_mapping.move_to_end(project_id)
+            return session_id
         except Exception as e:
             ui.warning(f"Failed to get session ID from DB: {e}", "Claude SDK")
             return self.session_mapping.get(project_id)
@@ -665,14 +801,20 @@ class ClaudeCodeCLI(BaseCLI):
         """Set session ID for project in database and memory"""
         try:
             # Store in memory as fallback
-            self.session_mapping[project_id] = session_id
+            self._remember_session_id(project_id, session_id)
             ui.debug(
                 f"Session ID stored for project {project_id}", "Claude SDK"
             )
         except Exception as e:
             ui.warning(f"Failed to save session ID: {e}", "Claude SDK")
             # Fallback to memory storage
-            self.session_mapping[project_id] = session_id
+            self._remember_session_id(project_id, session_id)
+
+    def _remember_session_id(self, project_id: str, session_id: str) -> None:
+        self.session_mapping[project_id] = session_id
+        self.session_mapping.move_to_end(project_id)
+        while len(self.session_mapping) > self._SESSION_MAPPING_MAX:
+            self.session_mapping.popitem(last=False)
 
 
 __all__ = ["ClaudeCodeCLI"]
@@ -4,17 +4,174 @@ Moved from unified_manager.py to a dedicated module.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import contextlib
+import heapq
 import os
+import random
+import tempfile
+import time
 from datetime import datetime
+from types import MappingProxyType
 
+from app.core.backpressure import UpstreamAdmissionTimeout, is_throttle_error
+from app.core.config import get_settings
 from app.core.terminal_ui import ui
 from app.core.websocket.manager import manager as ws_manager
+from app.db.async_session import AsyncSessionLocal
 from app.models.messages import Message
 
 from .adapters import ClaudeCodeCLI, CursorAgentCLI, CodexCLI, QwenCLI, GeminiCLI
 from .base import CLIType
 
+# Streamed messages are committed in batches (every N messages or after this many seconds),
+# each in its own short transaction on the async pool
+_FLUSH_BATCH_SIZE = 20
+_FLUSH_INTERVAL_SEC = 0.25
+
+# Stand-in for a missing metadata_json / original_event so the hot loop can .get() unconditionally
+_EMPTY_METADATA: Any = MappingProxyType({})
+
+# A manager is built per request, so availability probes are cached per process, keyed by CLI type
+_AVAILABILITY_TTL_SEC = 30.0
+_availability_cache: Dict[CLIType, Tuple[float, Dict[str, Any]]] = {}
+
+# Circuit breaker per CLI type: after this many consecutive failures the CLI is skipped
+# (straight to fallback) until the cooldown ends, then a single trial run is let through
+_BREAKER_THRESHOLD = 5
+_BREAKER_COOLDOWN_SEC = 30.0
+_breakers: Dict[CLIType, Dict[str, float]] = {}
+
+
+# Transient failures before a stream yields anything are retried with jittered exponential backoff
+_RETRY_MAX_ATTEMPTS = 3
+_RETRY_BASE_SEC = 1.0
+_RETRY_CAP_SEC = 30.0
+_RETRY_JITTER = 0.5
+
+
+def _is_transient_error(exc: BaseException) -> bool:
+    # Timeouts, dropped connections and upstream 429/5xx; missing binaries, auth errors etc. are not.
+    # Neither is a local admission timeout: retrying would just queue again while holding the bulkhead
+    if isinstance(exc, UpstreamAdmissionTimeout):
+        return False
+    return isinstance(exc, (asyncio.TimeoutError, ConnectionError)) or is_throttle_error(exc)
+
+
+# Bulkhead per CLI type: caps concurrent runs so one slow CLI can't exhaust the loop/FDs for all
+_bulkheads: Dict[CLIType, asyncio.Semaphore] = {}
+
+
+def _bulkhead(cli_type: CLIType) -> asyncio.Semaphore:
+    sem = _bulkheads.get(cli_type)
+    if sem is None:
+        sem = _bulkheads[cli_type] = asyncio.Semaphore(get_settings().cli_bulkhead_limit)
+    return sem
+
+
+class CLIRunDeadlineExceeded(Exception):
+    """A CLI run outlived Settings.cli_exec_timeout_sec."""
+
+
+@contextlib.asynccontextmanager
+async def _run_deadline(timeout: float):
+    """Raise CLIRunDeadlineExceeded if the block runs longer than ``timeout`` seconds (0 = no limit).
+
+    The deadline cancels the current task (asyncio.timeout), so the stream is consumed — and the
+    SDK client inside it driven — from the caller's own task, never a helper task.
+    """
+    if timeout <= 0:
+        yield
+        return
+    deadline = asyncio.timeout(timeout)
+    try:
+        async with deadline:
+            yield
+    except TimeoutError:
+        if deadline.expired():
+            raise CLIRunDeadlineExceeded() from None
+        raise
+
+
+# context/session-summary.md is appended to (O_APPEND, so other workers' lines survive) and only
+# trimmed back to the last N lines once it grows past the byte cap
+_SUMMARY_HEADER = "# Session Summary\n\n"
+_SUMMARY_MAX_LINES = 200
+_SUMMARY_TRIM_BYTES = 256 * 1024
+# Serializes this process's summary writes so a trim never races an append from another run
+_summary_lock = asyncio.Lock()
+
+
+def _write_summary(path: str, text: str) -> None:
+    """Replace ``path`` with ``text`` via a temp file + rename, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".md")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def _append_summary_line(path: str, line: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        if f.tell() == 0:
+            f.write(_SUMMARY_HEADER)
+        f.write(line)
+        size = f.tell()
+    if size <= _SUMMARY_TRIM_BYTES:
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    header: List[str] = []
+    if lines and lines[0].startswith("#"):
+        # keep first two lines (# header and blank)
+        header, lines = lines[:2], lines[2:]
+    _write_summary(path, "".join(header + lines[-_SUMMARY_MAX_LINES:]))
+
+
+def _breaker_allows(cli_type: CLIType) -> bool:
+    breaker = _breakers.get(cli_type)
+    if breaker is None or breaker["fails"] < _BREAKER_THRESHOLD:
+        return True
+    now = time.monotonic()
+    if now - breaker["opened_at"] < _BREAKER_COOLDOWN_SEC:
+        return False
+    # Half-open: this caller is the trial; others keep skipping until it resolves
+    breaker["opened_at"] = now
+    return True
+
+
+def _record_cli_result(cli_type: CLIType, ok: bool) -> None:
+    if ok:
+        _breakers.pop(cli_type, None)
+        return
+    breaker = _breakers.setdefault(cli_type, {"fails": 0, "opened_at": 0.0})
+    breaker["fails"] += 1
+    breaker["opened_at"] = time.monotonic()
+    if breaker["fails"] == _BREAKER_THRESHOLD:
+        ui.warning(f"CLI {cli_type.value} failed {_BREAKER_THRESHOLD} times in a row; pausing it", "CLI")
+
+
+# Adapters are built on first use; most requests only ever touch one of them
+_ADAPTER_FACTORIES: Dict[CLIType, Callable[[Any], Any]] = {
+    CLIType.CLAUDE: lambda db: ClaudeCodeCLI(),  # Use SDK implementation if available
+    CLIType.CURSOR: lambda db: CursorAgentCLI(db_session=db),
+    CLIType.CODEX: lambda db: CodexCLI(db_session=db),
+    CLIType.QWEN: lambda db: QwenCLI(db_session=db),
+    CLIType.GEMINI: lambda db: GeminiCLI(db_session=db),
+}
+
+# Adapters that keep no request-scoped state are shared process-wide, so their session map and
+# caches outlive the per-request manager (SDK clients are still opened per call). The others
+# hold this request's DB session and stay per manager.
+_SHARED_ADAPTER_TYPES = frozenset({CLIType.CLAUDE})
+_adapter_registry: Dict[CLIType, Any] = {}
+
 
 class UnifiedCLIManager:
     """Unified manager for all CLI implementations"""
@@ -33,14 +190,66 @@ class UnifiedCLIManager:
         self.conversation_id = conversation_id
         self.db = db
 
-        # Initialize CLI adapters with database session
-        self.cli_adapters = {
-            CLIType.CLAUDE: ClaudeCodeCLI(),  # Use SDK implementation if available
-            CLIType.CURSOR: CursorAgentCLI(db_session=db),
-            CLIType.CODEX: CodexCLI(db_session=db),
-            CLIType.QWEN: QwenCLI(db_session=db),
-            CLIType.GEMINI: GeminiCLI(db_session=db),
-        }
+        self._adapters: Dict[CLIType, Any] = {}
+
+    def _adapter(self, cli_type: CLIType) -> Optional[Any]:
+        """The adapter for ``cli_type``, built on first use (shared or with this manager's DB session), or None."""
+        cache = _adapter_registry if cli_type in _SHARED_ADAPTER_TYPES else self._adapters
+        adapter = cache.get(cli_type)
+        if adapter is None:
+            factory = _ADAPTER_FACTORIES.get(cli_type)
+            if factory is None:
+                return None
+            adapter = cache[cli_type] = factory(self.db)
+        return adapter
+
+    async def _check_availability(self, cli_type: CLIType) -> Dict[str, Any]:
+        """Adapter availability, probing at most once per TTL; returns a copy callers may mutate.
+
+        Only healthy results are cached, so a CLI that was just installed or logged in (or whose
+        probe hit a transient error) is re-probed on the next call instead of staying "down".
+        """
+        now = time.monotonic()
+        hit = _availability_cache.get(cli_type)
+        if hit is not None and now - hit[0] < _AVAILABILITY_TTL_SEC:
+            return dict(hit[1])
+        status = await self._adapter(cli_type).check_availability()
+        if status.get("available") and status.get("configured"):
+            _availability_cache[cli_type] = (now, status)
+        else:
+            _availability_cache.pop(cli_type, None)
+        return dict(status)
+
+    async def _stream_with_retry(self, cli, **kwargs):
+        """``cli.execute_with_streaming`` retried on transient errors raised before the first message.
+
+        Once a message has been yielded (persisted, sent to the UI, possibly files edited) errors
+        propagate unchanged, so a retry can never duplicate output.
+        """
+        for attempt in range(_RETRY_MAX_ATTEMPTS):
+            started = False
+            try:
+                async for message in cli.execute_with_streaming(**kwargs):
+                    started = True
+                    yield message
+                return
+            except Exception as e:
+                if started or attempt + 1 >= _RETRY_MAX_ATTEMPTS or not _is_transient_error(e):
+                    raise
+                delay = min(_RETRY_CAP_SEC, _RETRY_BASE_SEC * (2 ** attempt)) * (1 + random.random() * _RETRY_JITTER)
+                ui.warning(
+                    f"CLI {cli.cli_type.value} transient failure ({e}); retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 2}/{_RETRY_MAX_ATTEMPTS})",
+                    "CLI",
+                )
+                await asyncio.sleep(delay)
+
+    async def _warm_availability(self, *cli_types: CLIType) -> None:
+        """Probe several adapters concurrently so later _check_availability calls hit the cache."""
+        await asyncio.gather(
+            *(self._check_availability(t) for t in cli_types if t in _ADAPTER_FACTORIES),
+            return_exceptions=True,
+        )
 
     async def _attempt_fallback(
             self,
@@ -54,13 +263,17 @@ class UnifiedCLIManager:
         if failed_cli == fallback_type:
             return None
 
-        fallback_cli = self.cli_adapters.get(fallback_type)
+        fallback_cli = self._adapter(fallback_type)
         if not fallback_cli:
             ui.warning("Fallback CLI Claude not configured", "CLI")
             return None
 
-        status = await fallback_cli.check_availability()
+        if not _breaker_allows(fallback_type):
+            ui.error(f"Fallback CLI {fallback_type.value} paused after repeated failures", "CLI")
+            return None
+        status = await self._check_availability(fallback_type)
         if not status.get("available") or not status.get("configured"):
+            _record_cli_result(fallback_type, False)
             ui.error(
                 f"Fallback CLI {fallback_type.value} unavailable: {status.get('error', 'unknown error')}",
                 "CLI",
@@ -76,10 +289,13 @@ class UnifiedCLIManager:
             result = await self._execute_with_cli(
                 fallback_cli, instruction, images, model, is_initial_prompt, sub_agent=None
             )
+            _record_cli_result(fallback_type, True)
             result["fallback_used"] = True
             result["fallback_from"] = failed_cli.value
             return result
         except Exception as error:
+            if not isinstance(error, UpstreamAdmissionTimeout):
+                _record_cli_result(fallback_type, False)
             ui.error(
                 f"Fallback CLI {fallback_type.value} failed: {error}",
                 "CLI",
@@ -98,18 +314,37 @@ class UnifiedCLIManager:
     ) -> Dict[str, Any]:
         """Execute instruction with specified CLI"""
 
+        # Probe the fallback alongside the primary so a failover doesn't add a serial probe
+        if fallback_enabled and cli_type != CLIType.CLAUDE:
+            await self._warm_availability(cli_type, CLIType.CLAUDE)
+
         # Try the specified CLI
-        if cli_type in self.cli_adapters:
-            cli = self.cli_adapters[cli_type]
+        cli = self._adapter(cli_type)
+        if cli is not None:
 
-            # Check if CLI is available
-            status = await cli.check_availability()
+            # Check if CLI is available; a tripped breaker counts as unavailable until its cooldown ends
+            probed = _breaker_allows(cli_type)
+            if probed:
+                status = await self._check_availability(cli_type)
+            else:
+                status = {
+                    "available": False,
+                    "configured": True,
+                    "error": f"CLI {cli_type.value} paused after repeated failures",
+                }
             if status.get("available") and status.get("configured"):
                 try:
-                    return await self._execute_with_cli(
+                    result = await self._execute_with_cli(
                         cli, instruction, images, model, is_initial_prompt, sub_agent=sub_agent
                     )
+                    # The breaker tracks the adapter's health, not the outcome of the task: a run that
+                    # completed, even with success False, proves the CLI is reachable
+                    _record_cli_result(cli_type, True)
+                    return result
                 except Exception as e:
+                    # Waiting for a local upstream slot says nothing about the CLI itself
+                    if not isinstance(e, UpstreamAdmissionTimeout):
+                        _record_cli_result(cli_type, False)
                     ui.error(f"CLI {cli_type.value} failed: {e}", "CLI")
                     if fallback_enabled:
                         fallback_result = await self._attempt_fallback(
@@ -123,6 +358,8 @@ class UnifiedCLIManager:
                         "cli_attempted": cli_type.value,
                     }
             else:
+                if probed:
+                    _record_cli_result(cli_type, False)
                 ui.warning(
                     f"CLI {cli_type.value} unavailable: {status.get('error', 'CLI not available')}",
                     "CLI",
@@ -183,137 +420,183 @@ class UnifiedCLIManager:
             # CLI output logs are now only printed to console, not sent to UI
             pass
 
-        async for message in cli.execute_with_streaming(
-                instruction=instruction,
-                project_path=self.project_path,
-                session_id=self.session_id,
-                log_callback=log_callback,
-                images=images,
-                model=model,
-                is_initial_prompt=is_initial_prompt,
-                sub_agent=sub_agent,
-        ):
-            # Check for error messages or result status
-            if message.message_type == "error":
+        # Adapters assign message ids up front, so nothing downstream needs a per-message commit.
+        # Messages go through an AsyncSession: no thread hop, and a pooled connection is only held
+        # while a batch commits rather than for the whole (possibly minutes-long) stream.
+        # self.db (sync) stays with the request and the adapters' session-id bookkeeping.
+        adb = AsyncSessionLocal()
+        pending_flush = 0
+        last_flush = time.monotonic()
+
+        async def _commit_batch(final: bool = False):
+            # The batch was already sent over WS, so a lost batch must fail the run, not vanish:
+            # mid-stream it marks the run errored, the final commit's error propagates
+            nonlocal has_error
+            try:
+                await adb.commit()
+            except Exception as e:
+                with contextlib.suppress(Exception):
+                    await adb.rollback()
                 has_error = True
-                ui.error(f"CLI error detected: {message.content[:100]}", "CLI")
-
-            if message.metadata_json:
-                files = message.metadata_json.get("files_modified")
-                if isinstance(files, (list, tuple, set)):
-                    files_modified.update(str(f) for f in files)
-
-            # Capture provider result metrics when available (adapter emits a hidden 'result' message)
-            if message.message_type == "result" and message.metadata_json:
+                ui.error(f"Failed to persist streamed messages: {e}", "CLI")
+                if final:
+                    raise
+
+        # A single sender task keeps WS order while a slow client no longer stalls the stream/DB work
+        ws_queue: asyncio.Queue = asyncio.Queue()
+
+        async def _ws_sender():
+            while True:
+                payload = await ws_queue.get()
+                if payload is None:
+                    return
                 try:
-                    if "total_cost_usd" in message.metadata_json:
-                        cost_usd = float(message.metadata_json.get("total_cost_usd") or 0)
-                    if "num_turns" in message.metadata_json:
-                        num_turns = int(message.metadata_json.get("num_turns") or 0)
-                    if "duration_ms" in message.metadata_json:
-                        duration_ms = int(message.metadata_json.get("duration_ms") or 0)
-                    if "duration_api_ms" in message.metadata_json:
-                        api_duration_ms = int(message.metadata_json.get("duration_api_ms") or 0)
-                except Exception:
-                    pass
-
-            # Check for Cursor result event (stored in metadata)
-            if message.metadata_json:
-                event_type = message.metadata_json.get("event_type")
-                original_event = message.metadata_json.get("original_event", {})
-
-                if event_type == "result" or original_event.get("type") == "result":
-                    # Cursor sends result event with success/error status
-                    is_error = original_event.get("is_error", False)
-                    subtype = original_event.get("subtype", "")
-
-                    # DEBUG: Log the complete result event structure
-                    ui.info(f"🔍 [Cursor] Result event received:", "DEBUG")
-                    ui.info(f"   Full event: {original_event}", "DEBUG")
-                    ui.info(f"   is_error: {is_error}", "DEBUG")
-                    ui.info(f"   subtype: '{subtype}'", "DEBUG")
-                    ui.info(f"   has event.result: {'result' in original_event}", "DEBUG")
-                    ui.info(f"   has event.status: {'status' in original_event}", "DEBUG")
-                    ui.info(f"   has event.success: {'success' in original_event}", "DEBUG")
-
-                    if is_error or subtype == "error":
-                        has_error = True
-                        result_success = False
-                        ui.error(
-                            f"Cursor result: error (is_error={is_error}, subtype='{subtype}')",
-                            "CLI",
-                        )
-                    elif subtype == "success":
-                        result_success = True
-                        ui.success(
-                            f"Cursor result: success (subtype='{subtype}')", "CLI"
-                        )
-                    else:
-                        # Handle case where subtype is not "success" but execution was successful
-                        ui.warning(
-                            f"Cursor result: no explicit success subtype (subtype='{subtype}', is_error={is_error})",
-                            "CLI",
-                        )
-                        # If there's no error indication, assume success
-                        if not is_error:
-                            result_success = True
-                            ui.success(
-                                f"Cursor result: assuming success (no error detected)", "CLI"
-                            )
-
-            # Save message to database
-            message.project_id = self.project_id
-            message.conversation_id = self.conversation_id
-            self.db.add(message)
-            self.db.commit()
-
-            messages_collected.append(message)
-
-            # Check if message should be hidden from UI
-            should_hide = (
-                    message.metadata_json and message.metadata_json.get("hidden_from_ui", False)
-            )
-
-            # Send message via WebSocket only if not hidden
-            if not should_hide:
-                ws_message = {
-                    "type": "message",
-                    "data": {
-                        "id": message.id,
-                        "role": message.role,
-                        "message_type": message.message_type,
-                        "content": message.content,
-                        "metadata": message.metadata_json,
-                        "parent_message_id": getattr(message, "parent_message_id", None),
-                        "session_id": message.session_id,
-                        "conversation_id": self.conversation_id,
-                        "created_at": message.created_at.isoformat(),
-                    },
-                    "timestamp": message.created_at.isoformat(),
-                }
-                try:
-                    await ws_manager.send_message(self.project_id, ws_message)
+                    await ws_manager.send_message(self.project_id, payload)
                 except Exception as e:
                     ui.error(f"WebSocket send failed: {e}", "Message")
 
-            # Check if changes were made
-            if message.metadata_json and "changes_made" in message.metadata_json:
-                has_changes = True
+        bulkhead = _bulkhead(cli.cli_type)
+        await bulkhead.acquire()
+        stream = self._stream_with_retry(
+            cli,
+            instruction=instruction,
+            project_path=self.project_path,
+            session_id=self.session_id,
+            log_callback=log_callback,
+            images=images,
+            model=model,
+            is_initial_prompt=is_initial_prompt,
+            sub_agent=sub_agent,
+        )
+        ws_task = asyncio.create_task(_ws_sender())
+        try:
+            async with _run_deadline(get_settings().cli_exec_timeout_sec):
+                async for message in stream:
+                    message_type = message.message_type
+                    md = message.metadata_json or _EMPTY_METADATA
+
+                    # Check for error messages or result status
+                    if message_type == "error":
+                        has_error = True
+                        ui.error(f"CLI error detected: {message.content[:100]}", "CLI")
+
+                    if md:
+                        files = md.get("files_modified")
+                        if isinstance(files, (list, tuple, set)):
+                            files_modified.update(f if isinstance(f, str) else str(f) for f in files)
+
+                    # Capture provider result metrics when available (adapter emits a hidden 'result' message)
+                    if message_type == "result" and md:
+                        try:
+                            if "total_cost_usd" in md:
+                                cost_usd = float(md.get("total_cost_usd") or 0)
+                            if "num_turns" in md:
+                                num_turns = int(md.get("num_turns") or 0)
+                            if "duration_ms" in md:
+                                duration_ms = int(md.get("duration_ms") or 0)
+                            if "duration_api_ms" in md:
+                                api_duration_ms = int(md.get("duration_api_ms") or 0)
+                        except Exception:
+                            pass
+
+                    # Check for Cursor result event (stored in metadata)
+                    if md:
+                        original_event = md.get("original_event") or _EMPTY_METADATA
+
+                        if md.get("event_type") == "result" or original_event.get("type") == "result":
+                            # Cursor sends result event with success/error status
+                            is_error = original_event.get("is_error", False)
+                            subtype = original_event.get("subtype", "")
+
+                            if ui.debug_enabled:
+                                ui.debug(
+                                    f"[Cursor] Result event: is_error={is_error}, subtype='{subtype}', "
+                                    f"keys={sorted(original_event)}, event={original_event}",
+                                    "CLI",
+                                )
+
+                            if is_error or subtype == "error":
+                                has_error = True
+                                result_success = False
+                                ui.error(
+                                    f"Cursor result: error (is_error={is_error}, subtype='{subtype}')",
+                                    "CLI",
+                                )
+                            elif subtype == "success":
+                                result_success = True
+                                ui.success(
+                                    f"Cursor result: success (subtype='{subtype}')", "CLI"
+                                )
+                            else:
+                                # Handle case where subtype is not "success" but execution was successful
+                                ui.warning(
+                                    f"Cursor result: no explicit success subtype (subtype='{subtype}', is_error={is_error})",
+                                    "CLI",
+                                )
+                                # If there's no error indication, assume success
+                                if not is_error:
+                                    result_success = True
+                                    ui.success(
+                                        f"Cursor result: assuming success (no error detected)", "CLI"
+                                    )
+
+                    # Queue the WS send first so the client gets it while the DB flush below runs
+                    # (unless the message is hidden from the UI)
+                    if not md.get("hidden_from_ui", False):
+                        data = message.to_ws_dict(self.conversation_id)
+                        ws_message = {"type": "message", "data": data, "timestamp": data["created_at"]}
+                        ws_queue.put_nowait(ws_message)
+
+                    # Save message to database
+                    message.project_id = self.project_id
+                    message.conversation_id = self.conversation_id
+                    adb.add(message)
+                    pending_flush += 1
+                    if pending_flush >= _FLUSH_BATCH_SIZE or time.monotonic() - last_flush >= _FLUSH_INTERVAL_SEC:
+                        await _commit_batch()
+                        pending_flush = 0
+                        last_flush = time.monotonic()
+
+                    messages_collected.append(message)
+
+                    # Check if changes were made
+                    if "changes_made" in md:
+                        has_changes = True
+        except CLIRunDeadlineExceeded:
+            # A hung CLI stops holding the request, DB session and WS open; re-raised (after the
+            # cleanup below) so execute_instruction counts it toward the breaker and falls back
+            ui.error(
+                f"CLI {cli.cli_type.value} exceeded {get_settings().cli_exec_timeout_sec}s; stopping the stream",
+                "CLI",
+            )
+            raise
+        finally:
+            # Close the adapter stream here, in this task, even when the deadline cut it off
+            with contextlib.suppress(Exception):
+                await stream.aclose()
+            bulkhead.release()
+            try:
+                # Still persist what was streamed if the stream fails midway
+                if pending_flush:
+                    await _commit_batch(final=True)
+            finally:
+                await adb.close()
+                ws_queue.put_nowait(None)
+                await ws_task
 
         # Determine final success status
         # For Cursor: check result_success if available, otherwise check has_error
         # For others: check has_error
-        ui.info(
-            f"🔍 Final success determination: cli_type={cli.cli_type}, result_success={result_success}, has_error={has_error}",
-            "CLI",
-        )
-
         if cli.cli_type == CLIType.CURSOR and result_success is not None:
             success = result_success
-            ui.info(f"Using Cursor result_success: {result_success}", "CLI")
         else:
             success = not has_error
-            ui.info(f"Using has_error logic: not {has_error} = {success}", "CLI")
+        if ui.debug_enabled:
+            ui.debug(
+                f"Final success determination: cli_type={cli.cli_type.value}, "
+                f"result_success={result_success}, has_error={has_error} -> {success}",
+                "CLI",
+            )
 
         if success:
             ui.success(
@@ -327,16 +610,9 @@ class UnifiedCLIManager:
             )
 
         # Soft guardrail: if cost/turns exceed thresholds, emit a short notice message
-        cost_threshold = 0.0
-        turns_threshold = 0
-        try:
-            cost_threshold = float(os.getenv("COST_NOTICE_USD", "0.75") or "0.75")
-        except Exception:
-            cost_threshold = 0.75
-        try:
-            turns_threshold = int(os.getenv("TURNS_NOTICE_MIN", "10") or "10")
-        except Exception:
-            turns_threshold = 10
+        settings = get_settings()
+        cost_threshold = settings.cost_notice_usd
+        turns_threshold = settings.turns_notice_min
 
         notice_triggered = False
         if ((cost_usd is not None and cost_usd >= cost_threshold) or (num_turns is not None and num_turns >= turns_threshold)):
@@ -364,24 +640,14 @@ class UnifiedCLIManager:
                     conversation_id=self.conversation_id,
                     created_at=datetime.utcnow(),
                 )
-                self.db.add(notice)
-                self.db.commit()
+                async with AsyncSessionLocal() as notice_db:
+                    notice_db.add(notice)
+                    await notice_db.commit()
                 try:
-                    await ws_manager.send_message(self.project_id, {
-                        "type": "message",
-                        "data": {
-                            "id": notice.id,
-                            "role": notice.role,
-                            "message_type": notice.message_type,
-                            "content": notice.content,
-                            "metadata": notice.metadata_json,
-                            "parent_message_id": None,
-                            "session_id": notice.session_id,
-                            "conversation_id": notice.conversation_id,
-                            "created_at": notice.created_at.isoformat(),
-                        },
-                        "timestamp": notice.created_at.isoformat(),
-                    })
+                    data = notice.to_ws_dict()
+                    await ws_manager.send_message(
+                        self.project_id, {"type": "message", "data": data, "timestamp": data["created_at"]}
+                    )
                 except Exception as e:
                     ui.error(f"WebSocket send failed (notice): {e}", "Message")
             except Exception as e:
@@ -389,44 +655,19 @@ class UnifiedCLIManager:
 
         # Append concise session summary to context/session-summary.md
         try:
-            import os as _os_sum
-            ctx_dir = _os_sum.path.join(self.project_path, "context")
-            _os_sum.makedirs(ctx_dir, exist_ok=True)
-            sum_path = _os_sum.path.join(ctx_dir, "session-summary.md")
+            sum_path = os.path.join(self.project_path, "context", "session-summary.md")
             ts = datetime.utcnow().isoformat()
-            files_list = list(files_modified) if files_modified else []
-            files_preview = ", ".join(sorted(files_list)[:8])
-            if files_list and len(files_list) > 8:
-                files_preview += f" +{len(files_list)-8}"
+            files_preview = ", ".join(heapq.nsmallest(8, files_modified))
+            if len(files_modified) > 8:
+                files_preview += f" +{len(files_modified)-8}"
             cost_str = f"{(cost_usd or 0):.2f}"
             line = (
                 f"{ts} | cli={cli.cli_type.value} | sub_agent={sub_agent or '-'} | "
-                f"success={success} | changes={bool(files_list)} | files=[{files_preview}] | "
+                f"success={success} | changes={bool(files_modified)} | files=[{files_preview}] | "
                 f"cost=${cost_str} | turns={num_turns or 0}\n"
             )
-            # Initialize header if not exists
-            if not _os_sum.path.exists(sum_path):
-                with open(sum_path, "w", encoding="utf-8") as f:
-                    f.write("# Session Summary\n\n")
-            # Append line
-            with open(sum_path, "a", encoding="utf-8") as f:
-                f.write(line)
-            # Trim to last 200 lines (preserve header if present)
-            try:
-                with open(sum_path, "r", encoding="utf-8") as f:
-                    _lines = f.readlines()
-                _header = []
-                _body = _lines
-                if _lines and _lines[0].startswith("#"):
-                    # keep first two lines (# header and blank)
-                    _header = _lines[:2]
-                    _body = _lines[2:]
-                if len(_body) > 200:
-                    _body = _body[-200:]
-                with open(sum_path, "w", encoding="utf-8") as f:
-                    f.writelines(_header + _body)
-            except Exception:
-                pass
+            async with _summary_lock:
+                await asyncio.to_thread(_append_summary_line, sum_path, line)
         except Exception as e:
             ui.warning(f"Failed to update session-summary.md: {e}", "CLI")
 
@@ -452,12 +693,12 @@ class UnifiedCLIManager:
             self, cli_type: CLIType, selected_model: Optional[str] = None
     ) -> Dict[str, Any]:
         """Check status of a specific CLI"""
-        if cli_type in self.cli_adapters:
-            status = await self.cli_adapters[cli_type].check_availability()
+        if cli_type in _ADAPTER_FACTORIES:
+            status = await self._check_availability(cli_type)
 
             # Add model validation if model is specified
             if selected_model and status.get("available"):
-                cli = self.cli_adapters[cli_type]
+                cli = self._adapter(cli_type)
                 if not cli.is_model_supported(selected_model):
                     status[
                         "model_warning"
@@ -6,6 +6,8 @@ from typing import Dict, Any, Optional
 
 import httpx
 
+from app.core.backpressure import observe_httpx_response
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,6 +24,8 @@ class GitHubService:
     """GitHub API service for repository operations"""
 
     BASE_URL = "https://api.github.com"
+    # Report upstream status/rate-limit headers to GitHub's own backpressure controller
+    EVENT_HOOKS = {"response": [observe_httpx_response("github")]}
 
     def __init__(self, token: str):
         self.token = token
@@ -33,7 +37,7 @@ class GitHubService:
 
     async def check_token_validity(self) -> Dict[str, Any]:
         """Check if the GitHub token is valid and get user info"""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=self.EVENT_HOOKS) as client:
             try:
                 response = await client.get(
                     f"{self.BASE_URL}/user",
@@ -60,7 +64,7 @@ class GitHubService:
 
     async def check_repository_exists(self, repo_name: str, username: str) -> bool:
         """Check if a repository exists for the authenticated user"""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=self.EVENT_HOOKS) as client:
             try:
                 response = await client.get(
                     f"{self.BASE_URL}/repos/{username}/{repo_name}",
@@ -93,7 +97,7 @@ class GitHubService:
         if await self.check_repository_exists(repo_name, username):
             raise GitHubAPIError(f"Repository '{repo_name}' already exists", 409)
 
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=self.EVENT_HOOKS) as client:
             try:
                 payload = {
                     "name": repo_name,
@@ -151,7 +155,7 @@ class GitHubService:
 
     async def get_repository_info(self, username: str, repo_name: str) -> Optional[Dict[str, Any]]:
         """Get repository information including repository ID"""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=self.EVENT_HOOKS) as client:
             try:
                 response = await client.get(
                     f"{self.BASE_URL}/repos/{username}/{repo_name}",
@@ -180,7 +184,7 @@ class GitHubService:
 
     async def get_user_repositories(self, per_page: int = 30, page: int = 1) -> Dict[str, Any]:
         """Get user's repositories"""
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=self.EVENT_HOOKS) as client:
             try:
                 response = await client.get(
                     f"{self.BASE_URL}/user/repos",
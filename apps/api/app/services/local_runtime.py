@@ -1,3 +1,4 @@
+import functools
 import hashlib
 import os
 import re
@@ -46,8 +47,12 @@ def _get_npm_executable() -> str:
     )
 
 
+@functools.lru_cache(maxsize=1)
 def get_npm_executable() -> str:
-    """Public accessor for pnpm executable path (kept for backward compatibility)."""
+    """Public accessor for pnpm executable path (kept for backward compatibility).
+
+    The resolved path is stable per process, so it is cached after the first successful lookup.
+    """
     return _get_npm_executable()
 
 
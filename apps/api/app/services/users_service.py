@@ -47,8 +47,11 @@ class UsersService:
         return profile
 
     async def get_me(self, owner_id: str) -> UserProfileDTO:
-        profile = await self.get_or_create_profile(owner_id)
-        acct = await self.billing_repo.get_account(owner_id)
+        # Existing users (the common case) need a single joined query
+        profile, acct = await self.users_repo.get_profile_with_account(owner_id)
+        if profile is None:
+            profile = await self.get_or_create_profile(owner_id)
+            acct = await self.billing_repo.get_account(owner_id)
         return UserProfileDTO(
             owner_id=profile.owner_id,
             email=profile.email,
@@ -72,7 +75,11 @@ class UsersService:
         preferred_cli: Optional[str] = None,
         preferred_model: Optional[str] = None,
     ) -> UserProfileDTO:
-        profile = await self.get_or_create_profile(owner_id)
+        # Fetch the account with the profile up front instead of re-querying after the commit
+        profile, acct = await self.users_repo.get_profile_with_account(owner_id)
+        if profile is None:
+            profile = await self.get_or_create_profile(owner_id)
+            acct = await self.billing_repo.get_account(owner_id)
         if email is not None:
             profile.email = email
         if name is not None:
@@ -84,9 +91,8 @@ class UsersService:
         if preferred_model is not None:
             profile.preferred_model = preferred_model
         profile.updated_at = datetime.utcnow()
-        await self.users_repo.save(profile)
+        # The profile is attached to the session, so commit flushes the UPDATE itself
         await self.db.commit()
-        acct = await self.billing_repo.get_account(owner_id)
         return UserProfileDTO(
             owner_id=profile.owner_id,
             email=profile.email,
@@ -110,20 +116,19 @@ class UsersService:
         avatar_url: Optional[str] = None,
     ) -> None:
         now = datetime.utcnow()
-        profile = await self.get_or_create_profile(owner_id)
         # snapshot metadata
+        updates: dict = {}
         if email is not None:
-            profile.email = email
+            updates["email"] = email
         if name is not None:
-            profile.name = name
+            updates["name"] = name
         if avatar_url is not None:
-            profile.avatar_url = avatar_url
+            updates["avatar_url"] = avatar_url
         # update timestamps by event
         if event == "login":
-            profile.last_login_at = now
-            profile.last_active_at = now
-        else:
-            profile.last_active_at = now
-        profile.updated_at = now
-        await self.users_repo.save(profile)
+            updates["last_login_at"] = now
+        updates["last_active_at"] = now
+        updates["updated_at"] = now
+        # Single INSERT ... ON CONFLICT DO UPDATE instead of SELECT + UPDATE per heartbeat
+        await self.users_repo.upsert(owner_id, {**updates, "created_at": now}, update_columns=updates.keys())
         await self.db.commit()
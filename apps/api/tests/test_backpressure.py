@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.core.backpressure import (
+    BackpressureController,
+    UpstreamAdmissionTimeout,
+    is_throttle_error,
+    parse_retry_after,
+)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(" 0.5 ") == 0.5
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_is_throttle_error():
+    class StatusError(Exception):
+        status_code = 429
+
+    assert is_throttle_error(StatusError())
+    assert is_throttle_error(Exception("Rate limit exceeded"))
+    assert is_throttle_error(Exception("upstream overloaded"))
+    # "429" inside an id or byte count is not a status code
+    assert not is_throttle_error(Exception("wrote 14290 bytes"))
+    assert not is_throttle_error(Exception("file not found"))
+
+
+def test_aimd_bounds():
+    bp = BackpressureController(c_min=1.0, c_max=4.0)
+    bp.record_throttle()
+    assert bp.current_concurrency == 2.0
+    bp.record_success()
+    assert bp.current_concurrency == 2.5
+    for _ in range(10):
+        bp.record_throttle()
+    assert bp.current_concurrency == 1.0
+    for _ in range(20):
+        bp.record_success()
+    assert bp.current_concurrency == 4.0
+
+
+def test_latency_target_blocks_increase():
+    bp = BackpressureController(c_max=4.0, latency_target=1.0)
+    bp.record_throttle()
+    bp.record_success(latency=2.0)
+    assert bp.current_concurrency == 2.0
+
+
+def test_observe_retry_after_pauses():
+    bp = BackpressureController(c_min=1.0, c_max=8.0)
+    bp.observe(429, {"retry-after": "60"})
+    assert bp.scale() == pytest.approx(1.0 / 8.0)
+
+
+def test_observe_exhausted_quota_throttles():
+    bp = BackpressureController(c_max=8.0)
+    bp.observe(200, {"x-ratelimit-remaining": "0"})
+    assert bp.current_concurrency == 4.0
+
+
+def test_acquire_timeout_raises_admission_timeout():
+    async def main():
+        bp = BackpressureController(c_min=1.0, c_max=1.0)
+        await bp.acquire()
+        with pytest.raises(UpstreamAdmissionTimeout):
+            await bp.acquire(timeout=0.01)
+        # The timed-out waiter neither lingers in the queue nor holds a slot
+        assert not bp._waiters
+        assert bp._in_flight == 1
+        await bp.release()
+        assert bp._in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_release_hands_slot_to_waiters_in_order():
+    async def main():
+        bp = BackpressureController(c_min=1.0, c_max=1.0)
+        order = []
+
+        async def worker(name):
+            async with bp.slot():
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await bp.acquire()
+        tasks = [asyncio.create_task(worker(n)) for n in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert bp._in_flight == 1 and len(bp._waiters) == 3
+        await bp.release()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert bp._in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def main():
+        bp = BackpressureController(c_min=1.0, c_max=1.0)
+        await bp.acquire()
+        waiter = asyncio.create_task(bp.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await bp.release()
+        assert bp._in_flight == 0
+        # Capacity is intact: a fresh caller is admitted immediately
+        await asyncio.wait_for(bp.acquire(), 0.1)
+
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+import asyncio
+
+import pytest
+
+from app.core.backpressure import UpstreamAdmissionTimeout
+from app.services.cli import manager as cli_manager
+from app.services.cli.base import CLIType
+from app.services.cli.manager import (
+    CLIRunDeadlineExceeded,
+    UnifiedCLIManager,
+    _breaker_allows,
+    _is_transient_error,
+    _record_cli_result,
+    _run_deadline,
+)
+
+CLI = CLIType.CURSOR
+HEALTHY = {"available": True, "configured": True}
+
+
+@pytest.fixture(autouse=True)
+def _reset_state(monkeypatch):
+    monkeypatch.setattr(cli_manager, "_breakers", {})
+    monkeypatch.setattr(cli_manager, "_availability_cache", {})
+    monkeypatch.setattr(cli_manager, "_RETRY_BASE_SEC", 0.0)
+
+
+class FakeCLI:
+    cli_type = CLI
+
+    def __init__(self, outcomes=(), status=HEALTHY):
+        # Each outcome is a list of messages to yield, or an exception raised before any
+        self.outcomes = list(outcomes)
+        self.status = status
+        self.calls = 0
+        self.probes = 0
+
+    async def check_availability(self):
+        self.probes += 1
+        return dict(self.status)
+
+    async def execute_with_streaming(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        for message in outcome:
+            yield message
+
+
+def _manager(cli):
+    mgr = UnifiedCLIManager("p", "/tmp/p", "s", "c", db=None)
+    mgr._adapter = lambda cli_type: cli
+    return mgr
+
+
+def _trip(cli_type=CLI):
+    for _ in range(cli_manager._BREAKER_THRESHOLD):
+        _record_cli_result(cli_type, False)
+
+
+def test_breaker_opens_after_threshold_and_resets_on_success():
+    for _ in range(cli_manager._BREAKER_THRESHOLD - 1):
+        _record_cli_result(CLI, False)
+    assert _breaker_allows(CLI)
+    _record_cli_result(CLI, False)
+    assert not _breaker_allows(CLI)
+    _record_cli_result(CLI, True)
+    assert _breaker_allows(CLI)
+
+
+def test_breaker_half_open_admits_one_trial():
+    _trip()
+    cli_manager._breakers[CLI]["opened_at"] -= cli_manager._BREAKER_COOLDOWN_SEC + 1
+    assert _breaker_allows(CLI)
+    assert not _breaker_allows(CLI)
+
+
+def test_transient_error_classification():
+    assert _is_transient_error(asyncio.TimeoutError())
+    assert _is_transient_error(ConnectionResetError())
+    assert _is_transient_error(Exception("429 Too Many Requests"))
+    assert not _is_transient_error(UpstreamAdmissionTimeout("no slot"))
+    assert not _is_transient_error(FileNotFoundError("claude"))
+
+
+def _drain(mgr, cli):
+    async def main():
+        return [m async for m in mgr._stream_with_retry(cli)]
+
+    return asyncio.run(main())
+
+
+def test_retry_recovers_from_transient_error_before_first_message():
+    cli = FakeCLI([ConnectionError("reset"), ["a", "b"]])
+    assert _drain(_manager(cli), cli) == ["a", "b"]
+    assert cli.calls == 2
+
+
+def test_retry_gives_up_after_max_attempts():
+    cli = FakeCLI([ConnectionError("reset")] * cli_manager._RETRY_MAX_ATTEMPTS)
+    with pytest.raises(ConnectionError):
+        _drain(_manager(cli), cli)
+    assert cli.calls == cli_manager._RETRY_MAX_ATTEMPTS
+
+
+def test_no_retry_for_admission_timeout_or_after_output():
+    cli = FakeCLI([UpstreamAdmissionTimeout("no slot"), ["unused"]])
+    with pytest.raises(UpstreamAdmissionTimeout):
+        _drain(_manager(cli), cli)
+    assert cli.calls == 1
+
+    class MidStream(FakeCLI):
+        async def execute_with_streaming(self, **kwargs):
+            self.calls += 1
+            yield "partial"
+            raise ConnectionError("dropped")
+
+    cli = MidStream()
+    with pytest.raises(ConnectionError):
+        _drain(_manager(cli), cli)
+    assert cli.calls == 1
+
+
+def test_run_deadline():
+    async def main():
+        with pytest.raises(CLIRunDeadlineExceeded):
+            async with _run_deadline(0.01):
+                await asyncio.sleep(1)
+        # A TimeoutError raised inside the block is not mistaken for the deadline
+        with pytest.raises(TimeoutError) as info:
+            async with _run_deadline(5):
+                raise TimeoutError("inner")
+        assert not isinstance(info.value, CLIRunDeadlineExceeded)
+        async with _run_deadline(0):
+            await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+def test_availability_caches_only_healthy_results():
+    down = FakeCLI(status={"available": False, "configured": False})
+    mgr = _manager(down)
+    asyncio.run(mgr._check_availability(CLI))
+    asyncio.run(mgr._check_availability(CLI))
+    assert down.probes == 2
+
+    up = FakeCLI()
+    mgr = _manager(up)
+    first = asyncio.run(mgr._check_availability(CLI))
+    first["available"] = False  # callers get a copy
+    assert asyncio.run(mgr._check_availability(CLI)) == HEALTHY
+    assert up.probes == 1
+
+
+def _execute(mgr, monkeypatch, run):
+    monkeypatch.setattr(mgr, "_execute_with_cli", run)
+    return asyncio.run(mgr.execute_instruction("do it", CLI, fallback_enabled=False))
+
+
+def test_failed_task_result_does_not_trip_breaker(monkeypatch):
+    async def run(*args, **kwargs):
+        return {"success": False, "error": "tests failed"}
+
+    mgr = _manager(FakeCLI())
+    for _ in range(cli_manager._BREAKER_THRESHOLD + 1):
+        assert _execute(mgr, monkeypatch, run)["success"] is False
+    assert _breaker_allows(CLI)
+
+
+def test_admission_timeout_does_not_trip_breaker(monkeypatch):
+    async def run(*args, **kwargs):
+        raise UpstreamAdmissionTimeout("no slot")
+
+    mgr = _manager(FakeCLI())
+    for _ in range(cli_manager._BREAKER_THRESHOLD + 1):
+        _execute(mgr, monkeypatch, run)
+    assert _breaker_allows(CLI)
+
+
+def test_infrastructure_failures_trip_breaker(monkeypatch):
+    async def run(*args, **kwargs):
+        raise RuntimeError("CLI crashed")
+
+    mgr = _manager(FakeCLI())
+    for _ in range(cli_manager._BREAKER_THRESHOLD):
+        _execute(mgr, monkeypatch, run)
+    assert not _breaker_allows(CLI)
+
+
+def test_failed_probes_trip_breaker(monkeypatch):
+    async def run(*args, **kwargs):
+        raise AssertionError("must not run while unavailable")
+
+    mgr = _manager(FakeCLI(status={"available": False, "configured": True}))
+    for _ in range(cli_manager._BREAKER_THRESHOLD):
+        _execute(mgr, monkeypatch, run)
+    assert not _breaker_allows(CLI)
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+
+import orjson
+import pytest
+
+from app.core import rate_limit
+from app.core.rate_limit import RateLimitMiddleware, _decode_sub
+
+
+async def _app(scope, receive, send):
+    pass
+
+
+@pytest.fixture
+def limiter():
+    mw = RateLimitMiddleware(_app)
+    mw.redis = None
+    return mw
+
+
+def _jwt(claims: dict) -> str:
+    payload = base64.urlsafe_b64encode(orjson.dumps(claims)).rstrip(b"=").decode()
+    return f"e30.{payload}.sig"
+
+
+def test_minute_bucket_denies_then_refills(limiter):
+    assert [limiter._check_local("k", "w", 0.0, 2, 100)[0] for _ in range(3)] == [True, True, False]
+    allowed, retry_after, m_remaining, _ = limiter._check_local("k", "w", 0.0, 2, 100)
+    assert not allowed and retry_after == 30 and m_remaining == 0
+    # limit / 60s refill: one token back after 30s
+    assert limiter._check_local("k", "w", 30.0, 2, 100)[0]
+
+
+def test_reads_and_writes_use_separate_minute_buckets(limiter):
+    for _ in range(2):
+        limiter._check_local("k", "w", 0.0, 2, 100)
+    assert not limiter._check_local("k", "w", 0.0, 2, 100)[0]
+    # Exhausted writes leave the (higher) read allowance untouched
+    results = [limiter._check_local("k", "r", 0.0, 10, 100) for _ in range(10)]
+    assert all(r[0] for r in results)
+    assert results[-1][2] == 0
+
+
+def test_day_bucket_is_shared_across_classes(limiter):
+    assert limiter._check_local("k", "r", 0.0, 10, 2)[0]
+    assert limiter._check_local("k", "w", 0.0, 10, 2)[0]
+    allowed, retry_after, _, d_remaining = limiter._check_local("k", "r", 0.0, 10, 2)
+    assert not allowed and d_remaining == 0
+    assert retry_after == 43200
+
+
+def test_keys_are_independent(limiter):
+    assert limiter._check_local("a", "w", 0.0, 1, 100)[0]
+    assert not limiter._check_local("a", "w", 0.0, 1, 100)[0]
+    assert limiter._check_local("b", "w", 0.0, 1, 100)[0]
+
+
+def test_idle_keys_are_evicted(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "_BUCKET_IDLE_TTL", 10.0)
+    limiter._check_local("old", "r", 0.0, 5, 100)
+    idx = hash("old") & (rate_limit._SHARD_COUNT - 1)
+    # A new key landing in the same shard after the TTL drops the idle one
+    other = next(f"k{i}" for i in range(10_000) if hash(f"k{i}") & (rate_limit._SHARD_COUNT - 1) == idx)
+    limiter._check_local(other, "r", 20.0, 5, 100)
+    assert "old" not in limiter.shards[idx]
+
+
+def test_redis_keys_share_a_hashed_tag(limiter):
+    calls = []
+
+    class FakeRedis:
+        async def eval(self, script, numkeys, *args):
+            calls.append(args[:numkeys])
+            return [1, 1, 1, 0]
+
+    limiter.redis = FakeRedis()
+    key = "t:evil}{x|uid:u1"
+    assert asyncio.run(limiter._check_redis(key, "w", 10, 100)) == (True, 0, 9, 99)
+    asyncio.run(limiter._check_redis(key, "r", 50, 100))
+    (w_minute, w_day), (r_minute, r_day) = calls
+    tag = w_minute[w_minute.index("{") + 1:w_minute.index("}")]
+    assert len(tag) == 32 and all(c in "0123456789abcdef" for c in tag)
+    assert w_minute == f"rl:{{{tag}}}:m:w" and r_minute == f"rl:{{{tag}}}:m:r"
+    assert w_day == r_day == f"rl:{{{tag}}}:d"
+
+
+def test_redis_failure_falls_back_to_local(limiter):
+    class BrokenRedis:
+        async def eval(self, *args):
+            raise ConnectionError("down")
+
+    limiter.redis = BrokenRedis()
+    assert asyncio.run(limiter._check("k", "w", 1, 100))[0]
+    assert limiter._redis_retry_at > 0
+    # Still inside the retry backoff: served from the local bucket, which is now empty
+    assert not asyncio.run(limiter._check("k", "w", 1, 100))[0]
+
+
+def test_decode_sub():
+    assert _decode_sub(_jwt({"sub": "user-1"})) == "user-1"
+    assert _decode_sub(_jwt({"user_id": "user-2"})) == "user-2"
+    assert _decode_sub("not-a-jwt") is None
+    assert _decode_sub("a.!!!.c") is None
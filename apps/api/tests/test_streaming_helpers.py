@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from app.services.claude_act import _CoalescingLogger, _TagCapture
+from app.services.cli.adapters.claude_code import _buffered
+
+
+def _capture(chunks, tag="SUMMARY", max_chars=4000):
+    cap = _TagCapture(tag, max_chars=max_chars)
+    for chunk in chunks:
+        cap.feed(chunk)
+    return cap
+
+
+def test_tag_capture_single_chunk():
+    cap = _capture(["before <SUMMARY> done it </SUMMARY> after"])
+    assert cap.done and cap.value == "done it"
+
+
+def test_tag_capture_tags_split_across_chunks():
+    text = "x<COMMIT_MSG>fix the bug</COMMIT_MSG>y"
+    for size in (1, 2, 3, 7):
+        cap = _capture([text[i:i + size] for i in range(0, len(text), size)], tag="COMMIT_MSG")
+        assert cap.value == "fix the bug", size
+
+
+def test_tag_capture_keeps_first_span_only():
+    cap = _capture(["<SUMMARY>one</SUMMARY>", "<SUMMARY>two</SUMMARY>"])
+    assert cap.value == "one"
+
+
+def test_tag_capture_unclosed_and_bounded():
+    cap = _capture(["<SUMMARY>", "a" * 100, "b" * 100], max_chars=50)
+    assert not cap.done and cap.value is None
+    cap.feed("</SUMMARY>")
+    assert cap.value == "a" * 50
+
+
+def test_coalescing_logger_merges_text_until_another_event():
+    async def main():
+        events = []
+
+        async def callback(kind, payload):
+            events.append((kind, payload))
+
+        log = _CoalescingLogger(callback, window_s=10.0)
+        await log("text", {"content": "a"})
+        await log("text", {"content": "b"})
+        assert events == []
+        await log("tool", {"name": "Edit"})
+        assert events == [("text", {"content": "ab", "segments": 2}), ("tool", {"name": "Edit"})]
+
+    asyncio.run(main())
+
+
+def test_coalescing_logger_flushes_on_window_and_size():
+    async def main():
+        events = []
+
+        async def callback(kind, payload):
+            events.append(payload["content"])
+
+        log = _CoalescingLogger(callback, window_s=0.01, max_chars=4)
+        await log("text", {"content": "hi"})
+        await asyncio.sleep(0.05)
+        assert events == ["hi"]
+        await log("text", {"content": "long"})
+        assert events == ["hi", "long"]
+        await log.flush()
+        assert events == ["hi", "long"]
+
+    asyncio.run(main())
+
+
+async def _items(n, fail_at=None, seen=None):
+    for i in range(n):
+        if i == fail_at:
+            raise RuntimeError("boom")
+        if seen is not None:
+            seen.append(i)
+        yield i
+
+
+def test_buffered_yields_everything_in_order():
+    async def main():
+        return [i async for i in _buffered(_items(5), limit=2)]
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+
+
+def test_buffered_reraises_source_error_after_prior_items():
+    async def main():
+        got = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async for i in _buffered(_items(5, fail_at=2)):
+                got.append(i)
+        return got
+
+    assert asyncio.run(main()) == [0, 1]
+
+
+def test_buffered_stops_prefetching_at_stop_item():
+    async def main():
+        seen = []
+        got = [i async for i in _buffered(_items(10, seen=seen), limit=4, stop=lambda i: i == 2)]
+        return got, seen
+
+    got, seen = asyncio.run(main())
+    assert got == [0, 1, 2]
+    # Nothing past the stop item is pulled from the source
+    assert seen == [0, 1, 2]